@@ -80,13 +80,6 @@ hidden_imports = [
     'whoosh.qparser',
     'whoosh.analysis',
     'whoosh.support',
-    'docx',
-    'docx.opc',
-    'docx.oxml',
-    'docx.parts',
-    'openpyxl',
-    'openpyxl.workbook',
-    'openpyxl.worksheet',
     'yaml',
     'loguru',
     'watchdog',
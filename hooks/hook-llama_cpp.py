@@ -24,7 +24,7 @@ hiddenimports = [
 
 # Try to collect llama_cpp modules
 try:
-    from PyInstaller.utils.hooks import collect_all, collect_dynamic_libs
+    from PyInstaller.utils.hooks import collect_all
 
     try:
         ll_datas, ll_binaries, ll_hiddenimports = collect_all('llama_cpp')
@@ -35,18 +35,28 @@ try:
     except Exception as e:
         print(f"[hook-llama_cpp] collect_all failed: {e}")
 
-    try:
-        dyn_datas, dyn_binaries, dyn_hiddenimports = collect_dynamic_libs('llama_cpp')
-        datas += dyn_datas
-        binaries += dyn_binaries
-        hiddenimports += dyn_hiddenimports
-        print(f"[hook-llama_cpp] collect_dynamic_libs: {len(dyn_binaries)} binaries")
-    except Exception as e:
-        print(f"[hook-llama_cpp] collect_dynamic_libs failed: {e}")
-
 except ImportError as e:
     print(f"[hook-llama_cpp] PyInstaller hooks not available: {e}")
 
+# Directories that never contain shared libraries
+_SKIP_DIRS = {'__pycache__', 'include'}
+
+
+def _iter_shared_libs(pkg_dir, rel_dir='llama_cpp'):
+    """Walk pkg_dir once with scandir, yielding (path, dest_dir, name) for files"""
+    try:
+        entries = list(os.scandir(pkg_dir))
+    except OSError:
+        return
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name not in _SKIP_DIRS:
+                yield from _iter_shared_libs(entry.path, os.path.join(rel_dir, entry.name))
+        elif not entry.name.endswith(('.py', '.pyc', '.pyi', '.h', '.cpp')):
+            yield entry.path, rel_dir, entry.name
+
+
 # Platform-specific binary collection
 try:
     import llama_cpp
@@ -72,35 +82,26 @@ try:
 
     elif sys.platform == 'darwin':
         # macOS: Look for dylibs
-        for root, dirs, files in os.walk(package_dir):
-            for file in files:
-                if file.endswith('.dylib') or file.endswith('.so'):
-                    lib_path = os.path.join(root, file)
-                    rel_dir = os.path.relpath(root, package_dir)
-                    if rel_dir == '.':
-                        rel_dir = 'llama_cpp'
-                    else:
-                        rel_dir = os.path.join('llama_cpp', rel_dir)
-                    binaries.append((lib_path, rel_dir))
-                    print(f"[hook-llama_cpp] Found dylib: {lib_path}")
+        for lib_path, rel_dir, name in _iter_shared_libs(package_dir):
+            if name.endswith('.dylib') or name.endswith('.so'):
+                binaries.append((lib_path, rel_dir))
+                print(f"[hook-llama_cpp] Found dylib: {lib_path}")
 
     else:
         # Linux: Look for .so files
-        for root, dirs, files in os.walk(package_dir):
-            for file in files:
-                if file.endswith('.so') or '.so.' in file:
-                    lib_path = os.path.join(root, file)
-                    rel_dir = os.path.relpath(root, package_dir)
-                    if rel_dir == '.':
-                        rel_dir = 'llama_cpp'
-                    else:
-                        rel_dir = os.path.join('llama_cpp', rel_dir)
-                    binaries.append((lib_path, rel_dir))
-                    print(f"[hook-llama_cpp] Found .so: {lib_path}")
+        for lib_path, rel_dir, name in _iter_shared_libs(package_dir):
+            if name.endswith('.so') or '.so.' in name:
+                binaries.append((lib_path, rel_dir))
+                print(f"[hook-llama_cpp] Found .so: {lib_path}")
 
 except ImportError:
     print("[hook-llama_cpp] llama_cpp not installed, skipping binary collection")
 except Exception as e:
     print(f"[hook-llama_cpp] Error collecting binaries: {e}")
 
+# Drop duplicate entries found by both collect_all and the platform walk
+binaries = list({(os.path.realpath(src), dest): (src, dest) for src, dest in binaries}.values())
+datas = list({(os.path.realpath(src), dest): (src, dest) for src, dest in datas}.values())
+hiddenimports = list(dict.fromkeys(hiddenimports))
+
 print(f"[hook-llama_cpp] Final: {len(hiddenimports)} imports, {len(binaries)} binaries, {len(datas)} data files")
@@ -7,6 +7,25 @@ Ensures dynamic libraries can be found at runtime
 import os
 import sys
 
+# Handles returned by os.add_dll_directory; the directory is removed from the
+# search path when its handle is closed, so keep them alive for the process.
+_DLL_COOKIES = []
+
+
+def _add_dll_directory(path):
+    """Add a DLL search directory on Windows and keep its handle"""
+    if not os.path.isdir(path):
+        return
+    if hasattr(os, 'add_dll_directory'):
+        try:
+            _DLL_COOKIES.append(os.add_dll_directory(path))
+        except OSError:
+            pass
+    else:
+        # Python < 3.8 still resolves DLL dependencies through PATH
+        os.environ['PATH'] = path + os.pathsep + os.environ.get('PATH', '')
+
+
 def setup_llama_cpp_paths():
     """Setup library paths for llama-cpp-python"""
     # Check if we're running in a PyInstaller bundle
@@ -20,11 +39,7 @@ def setup_llama_cpp_paths():
     if os.path.isdir(llama_lib_dir):
         # Add to DLL search path (Windows)
         if sys.platform == 'win32':
-            try:
-                os.add_dll_directory(llama_lib_dir)
-            except (AttributeError, OSError):
-                # Fallback for older Python versions
-                os.environ['PATH'] = llama_lib_dir + os.pathsep + os.environ.get('PATH', '')
+            _add_dll_directory(llama_lib_dir)
 
         # Set library path for Linux/macOS
         elif sys.platform == 'darwin':
@@ -38,10 +53,7 @@ def setup_llama_cpp_paths():
 
     # Also check root bundle directory for libraries
     if sys.platform == 'win32':
-        try:
-            os.add_dll_directory(bundle_dir)
-        except (AttributeError, OSError):
-            pass
+        _add_dll_directory(bundle_dir)
 
 # Run setup on import
 setup_llama_cpp_paths()
@@ -2,26 +2,33 @@
 import os
 import sys
 
-# Ensure PyQt6 can find its plugins
-from PyQt6 import QtCore
 
-# Add PyQt6's plugin path to QT_PLUGIN_PATH
-if hasattr(QtCore, 'QLibraryInfo'):
-    try:
-        plugin_path = QtCore.QLibraryInfo.path(QtCore.QLibraryInfo.LibraryPath.PluginsPath)
-        if os.path.isdir(plugin_path):
-            os.environ['QT_PLUGIN_PATH'] = plugin_path
-            # Also add to sys.path for good measure
-            if plugin_path not in sys.path:
-                sys.path.append(plugin_path)
-    except Exception:
-        pass
+def _find_plugin_path():
+    """Locate PyQt6's plugin directory without importing QtCore when possible"""
+    # In a PyInstaller bundle the plugins live at a fixed location
+    if getattr(sys, 'frozen', False):
+        bundled = os.path.join(sys._MEIPASS, 'PyQt6', 'Qt6', 'plugins')
+        if os.path.isdir(bundled):
+            return bundled
+
+    # Only ask Qt if it has already been imported
+    if 'PyQt6.QtCore' in sys.modules:
+        QtCore = sys.modules['PyQt6.QtCore']
+        try:
+            return QtCore.QLibraryInfo.path(QtCore.QLibraryInfo.LibraryPath.PluginsPath)
+        except Exception:
+            pass
+
+    return None
+
+
+# Ensure PyQt6 can find its plugins
+plugin_path = _find_plugin_path()
+if plugin_path and os.path.isdir(plugin_path):
+    os.environ['QT_PLUGIN_PATH'] = plugin_path
 
 # Workaround for PyInstaller not finding Qt6 DLLs on Windows
 if sys.platform == 'win32':
-    import ctypes
-    import ctypes.util
-    
     # Try to locate Qt6Core.dll
     try:
         # First, check if we're in a PyInstaller bundle
@@ -30,6 +37,10 @@ if sys.platform == 'win32':
             bundle_dir = sys._MEIPASS
             qt_dll_dir = os.path.join(bundle_dir, 'PyQt6', 'Qt6', 'bin')
             if os.path.isdir(qt_dll_dir):
-                os.environ['PATH'] = qt_dll_dir + os.pathsep + os.environ['PATH']
+                if hasattr(os, 'add_dll_directory'):
+                    # Keep the handle alive, closing it removes the directory
+                    _QT_DLL_COOKIE = os.add_dll_directory(qt_dll_dir)
+                else:
+                    os.environ['PATH'] = qt_dll_dir + os.pathsep + os.environ['PATH']
     except Exception:
-        pass
\ No newline at end of file
+        pass
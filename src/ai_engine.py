@@ -7,32 +7,323 @@ AI 引擎模块
 
 import os
 import re
+import sys
 import json
+import atexit
 import time
+import platform
+import threading
 import subprocess
 import shutil
-import urllib.request
-import urllib.error
+import string
+import codecs
+import importlib.util
+import socket
+import tempfile
+import urllib.parse
+import http.client
+from datetime import date
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Tuple, Union
+from typing import Dict, List, Any, Optional, Tuple, Union, Callable
 from dataclasses import dataclass
 from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
+from collections import OrderedDict
 
 from loguru import logger
 
 from .config import get_config
 
+# 预编译正则表达式
+_RE_JSON = re.compile(r'\{.*\}', re.DOTALL)
+_RE_KEYWORDS = re.compile(r'[\u4e00-\u9fff\w]{2,}')
+_RE_NON_WORD = re.compile(r'\W+')
+
+# 回答提示词中文件之间的分隔线
+_CONTEXT_SEPARATOR = '-' * 40
+
+# 查询分析结果的 GBNF 语法，约束模型只输出符合结构的 JSON 对象
+_QUERY_ANALYSIS_GRAMMAR = r'''
+root       ::= "{" ws "\"keywords\"" ws ":" ws strings ws "," ws "\"filters\"" ws ":" ws filters ws "," ws "\"intent\"" ws ":" ws string ws "," ws "\"confidence\"" ws ":" ws number ws "}"
+filters    ::= "{" ws ( "\"extensions\"" ws ":" ws strings ws )? "}"
+strings    ::= "[" ws ( string ( ws "," ws string )* )? ws "]"
+string     ::= "\"" ( [^"\\\x7F\x00-\x1F] | "\\" ["\\/bfnrt] )* "\""
+number     ::= "0" ( "." [0-9] [0-9]? )? | "1" ( ".0" )?
+ws         ::= [ \t]?
+'''.strip()
+
+# 摘要：内容最大字符数、生成的最大 token 数、模板本身预留的 token 数
+_SUMMARY_MAX_CHARS = 3000
+_SUMMARY_MAX_TOKENS = 200
+_SUMMARY_PROMPT_TOKENS = 64
+_SUMMARY_TEMPERATURE = 0.2
+
+# 温度不高于此值的生成结果近似确定，可以缓存复用
+_CACHE_MAX_TEMPERATURE = 0.2
+
+
+def _extract_keywords(text: str) -> List[str]:
+    """提取长度不小于 2 的关键词（中文、英文、数字）"""
+    # 纯 ASCII 文本直接按非单词字符切分，比 Unicode 正则匹配更快
+    if text.isascii():
+        return [w for w in _RE_NON_WORD.split(text) if len(w) >= 2]
+    return _RE_KEYWORDS.findall(text)
+
 
 @dataclass
 class QueryAnalysis:
     """查询分析结果"""
+    # 字段均无默认值，可直接声明 __slots__（兼容 Python 3.10 以下的 dataclass）
+    __slots__ = ('keywords', 'filters', 'intent', 'confidence')
+
     keywords: List[str]  # 关键词列表
     filters: Dict[str, Any]  # 过滤条件
     intent: str  # 用户意图
     confidence: float  # 置信度
 
 
+# 卸载到 GPU 的层数，大于任何模型的层数即表示全部卸载
+_GPU_OFFLOAD_LAYERS = 999
+
+# GPU 检测结果缓存文件
+_GPU_CACHE_FILE = Path.home() / '.cache' / 'smart-file-search' / 'gpu.json'
+
+
+def _nvml_device_count() -> Optional[int]:
+    """通过 NVML 获取 NVIDIA GPU 数量，NVML 不可用时返回 None"""
+    # 优先使用 pynvml（如已安装）
+    try:
+        import pynvml
+        pynvml.nvmlInit()
+        try:
+            return pynvml.nvmlDeviceGetCount()
+        finally:
+            pynvml.nvmlShutdown()
+    except ImportError:
+        pass
+    except Exception:
+        return 0
+
+    import ctypes
+
+    if sys.platform == 'win32':
+        lib_names = ['nvml.dll']
+    else:
+        lib_names = ['libnvidia-ml.so.1', 'libnvidia-ml.so']
+
+    for lib_name in lib_names:
+        try:
+            nvml = ctypes.CDLL(lib_name)
+        except OSError:
+            continue
+
+        try:
+            if nvml.nvmlInit_v2() != 0:
+                return 0
+            try:
+                count = ctypes.c_uint(0)
+                if nvml.nvmlDeviceGetCount_v2(ctypes.byref(count)) == 0:
+                    return count.value
+                return 0
+            finally:
+                nvml.nvmlShutdown()
+        except AttributeError:
+            return None
+
+    return None
+
+
+def _probe_gpu() -> dict:
+    """实际探测 GPU（尽量避免启动子进程）"""
+    gpu_info = {
+        'available': False,
+        'type': None,
+        'device_count': 0,
+    }
+
+    # Apple Silicon 上存在 Metal 框架即可使用，无需调用 system_profiler
+    if (platform.system() == 'Darwin' and platform.machine() == 'arm64'
+            and os.path.isdir('/System/Library/Frameworks/Metal.framework')):
+        gpu_info['available'] = True
+        gpu_info['type'] = 'metal'
+        logger.info("检测到Apple Silicon GPU (Metal)")
+        return gpu_info
+
+    # NVIDIA：优先使用 NVML，仅在库不可用时回退到 nvidia-smi
+    device_count = _nvml_device_count()
+    if device_count is None and shutil.which('nvidia-smi'):
+        try:
+            result = subprocess.run(['nvidia-smi', '--query-gpu=name', '--format=csv,noheader'],
+                                    capture_output=True, text=True, timeout=2)
+            if result.returncode == 0 and result.stdout.strip():
+                device_count = len(result.stdout.strip().split('\n'))
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            pass
+
+    if device_count:
+        gpu_info['available'] = True
+        gpu_info['type'] = 'cuda'
+        gpu_info['device_count'] = device_count
+        logger.info("检测到NVIDIA GPU")
+        return gpu_info
+
+    # AMD ROCm：存在 /dev/kfd 才说明驱动已加载
+    if os.path.exists('/dev/kfd'):
+        gpu_info['available'] = True
+        gpu_info['type'] = 'rocm'
+        logger.info("检测到AMD GPU (ROCm)")
+
+    return gpu_info
+
+
+def _physical_cpu_count() -> int:
+    """获取 CPU 物理核心数（psutil 不可用时按逻辑核心数减一估算）"""
+    try:
+        import psutil
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return count
+    except ImportError:
+        pass
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _gpu_cache_key() -> list:
+    """GPU 缓存键：主机名、架构以及 nvidia-smi 的修改时间"""
+    smi_mtime = None
+    smi_path = shutil.which('nvidia-smi')
+    if smi_path:
+        try:
+            smi_mtime = os.path.getmtime(smi_path)
+        except OSError:
+            pass
+    return [platform.node(), platform.machine(), smi_mtime]
+
+
+@lru_cache(maxsize=1)
+def _detect_gpu_cached() -> dict:
+    """检测 GPU，结果缓存在 ~/.cache/smart-file-search/gpu.json"""
+    key = _gpu_cache_key()
+
+    try:
+        with open(_GPU_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get('key') == key:
+            return cached['gpu_info']
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    gpu_info = _probe_gpu()
+
+    try:
+        _GPU_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = _GPU_CACHE_FILE.with_suffix('.json.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'gpu_info': gpu_info}, f)
+        os.replace(tmp_file, _GPU_CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"写入 GPU 缓存失败: {e}")
+
+    return gpu_info
+
+
+@lru_cache(maxsize=1)
+def _llama_cpp_installed() -> bool:
+    """检查 llama-cpp-python 是否已安装（每个进程只检查一次）
+
+    只查找模块而不导入，避免在探测阶段加载体积很大的共享库；
+    真正的导入推迟到 load_model。
+    """
+    try:
+        return importlib.util.find_spec('llama_cpp') is not None
+    except (ImportError, ValueError):
+        return False
+
+
+# llama.cpp 的服务程序和命令行程序（按优先级）
+_LLAMA_SERVER_NAMES = ('llama-server',)
+_LLAMA_CLI_NAMES = ('llama-cli', 'main', 'llama')
+
+
+# 可执行文件查找结果的有效期（秒），过期后重新查找以发现运行期间新安装的程序
+_LLAMA_LOCATE_TTL = 30
+_llama_executables: Optional[Tuple[float, Dict[str, str]]] = None
+_llama_executables_lock = threading.Lock()
+
+
+def _locate_llama_executables() -> Dict[str, str]:
+    """查找全部 llama.cpp 可执行文件，结果缓存 _LLAMA_LOCATE_TTL 秒
+
+    Returns:
+        命令名 -> 可执行文件路径
+    """
+    global _llama_executables
+    with _llama_executables_lock:
+        now = time.monotonic()
+        if _llama_executables is None or now - _llama_executables[0] >= _LLAMA_LOCATE_TTL:
+            _llama_executables = (now, _scan_llama_executables())
+        return _llama_executables[1]
+
+
+def _scan_llama_executables() -> Dict[str, str]:
+    """一次遍历 PATH 查找全部 llama.cpp 可执行文件"""
+    candidates = _LLAMA_SERVER_NAMES + _LLAMA_CLI_NAMES
+
+    # 可执行文件名 -> 候选命令（Windows 下需要考虑 PATHEXT 且不区分大小写）
+    if sys.platform == 'win32':
+        suffixes = [ext.lower() for ext in os.environ.get('PATHEXT', '.EXE').split(os.pathsep) if ext]
+    else:
+        suffixes = ['']
+    names = {cmd + suffix: cmd for cmd in candidates for suffix in suffixes}
+
+    # PATH 与常见位置合并，一次遍历
+    search_dirs = os.environ.get('PATH', '').split(os.pathsep) + [
+        str(Path.home() / '.local' / 'bin'),
+        '/usr/local/bin',
+        '/usr/bin',
+    ]
+
+    found: Dict[str, str] = {}
+    for directory in dict.fromkeys(search_dirs):
+        if not directory:
+            continue
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name.lower() if sys.platform == 'win32' else entry.name
+                    cmd = names.get(name)
+                    if (cmd and cmd not in found and entry.is_file()
+                            and os.access(entry.path, os.X_OK)):
+                        found[cmd] = entry.path
+        except OSError:
+            continue
+
+        # 服务程序和首选命令行程序都已找到，无需继续
+        if _LLAMA_SERVER_NAMES[0] in found and _LLAMA_CLI_NAMES[0] in found:
+            break
+
+    return found
+
+
+def _first_found(names: Tuple[str, ...]) -> Optional[str]:
+    """按优先级返回第一个找到的 llama.cpp 可执行文件"""
+    found = _locate_llama_executables()
+    for cmd in names:
+        if cmd in found:
+            return found[cmd]
+    return None
+
+
+def _locate_llama_cli() -> Optional[str]:
+    """查找 llama.cpp 命令行程序"""
+    return _first_found(_LLAMA_CLI_NAMES)
+
+
+def _locate_llama_server() -> Optional[str]:
+    """查找 llama.cpp HTTP 服务程序"""
+    return _first_found(_LLAMA_SERVER_NAMES)
+
+
 class AIBackend:
     """AI 后端基类"""
     def __init__(self, config):
@@ -48,6 +339,27 @@ class AIBackend:
     def complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Optional[str]:
         raise NotImplementedError
 
+    def stream_complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """流式生成，每段文本回调一次 on_token，回调返回 False 时停止；默认实现一次性回调完整结果"""
+        response = self.complete(prompt, max_tokens=max_tokens, temperature=temperature)
+        if response and on_token:
+            on_token(response)
+        return response
+
+    def complete_json(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                      grammar: Optional[str] = None) -> Optional[str]:
+        """生成包含 JSON 对象的回复，grammar 为可选的 GBNF 语法约束；默认与 complete 相同"""
+        return self.complete(prompt, max_tokens=max_tokens, temperature=temperature)
+
+    def warm_prefix(self, prefix: str) -> None:
+        """预先计算提示词前缀，默认不做任何事"""
+        pass
+
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """按 token 数截断文本，默认无法分词时原样返回"""
+        return text
+
     def get_status(self) -> Dict[str, Any]:
         return {"available": self.is_available()}
 
@@ -55,28 +367,154 @@ class AIBackend:
         pass
 
 
+class _KeepAliveClient:
+    """基于 http.client 的长连接 HTTP 客户端，每个线程复用一条连接"""
+
+    def __init__(self, base_url: str):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port
+        self._local = threading.local()
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+            self._local.conn = conn
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _send(self, method: str, path: str, body: Optional[bytes],
+              timeout: float) -> http.client.HTTPResponse:
+        """发送请求并返回响应对象，服务端关闭空闲连接时自动重连一次"""
+        headers = {'Connection': 'keep-alive'}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):
+            conn = self._connection(timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                return conn.getresponse()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    BrokenPipeError, ConnectionResetError):
+                self._reset()
+                if attempt:
+                    raise
+            except Exception:
+                self._reset()
+                raise
+
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                timeout: float = 60) -> Tuple[int, bytes]:
+        """发送请求并返回 (状态码, 响应体)"""
+        try:
+            response = self._send(method, path, body, timeout)
+            return response.status, response.read()
+        except Exception:
+            self._reset()
+            raise
+
+    def stream_lines(self, method: str, path: str, body: Optional[bytes] = None,
+                     timeout: float = 60):
+        """发送请求并逐行返回响应体；提前停止读取时关闭连接，避免残留数据污染下一次请求"""
+        response = self._send(method, path, body, timeout)
+        finished = False
+        try:
+            if response.status != 200:
+                response.read()
+                finished = True
+                raise http.client.HTTPException(f"HTTP {response.status}")
+            for line in response:
+                yield line
+            finished = True
+        finally:
+            if not finished:
+                self._reset()
+
+
+class _JsonObjectTracker:
+    """增量跟踪文本中第一个 JSON 对象是否已闭合（忽略字符串内的括号）"""
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        """输入新文本，第一个顶层对象闭合时返回 True"""
+        for ch in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                if self.started:
+                    self.in_string = True
+            elif ch == '{':
+                self.depth += 1
+                self.started = True
+            elif ch == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
+
 class OllamaBackend(AIBackend):
     """Ollama 后端 - 最简单的本地AI方案"""
 
+    # 按服务地址共享的长连接客户端
+    _clients: Dict[str, _KeepAliveClient] = {}
+    _clients_lock = threading.Lock()
+
+    # 服务可用性检查结果的有效期（秒），过期后重新检查以发现服务启停
+    AVAILABILITY_TTL = 30
+
     def __init__(self, config):
         super().__init__(config)
         self.model_name = "llama3.2:1b"  # 默认使用小模型
         self.api_url = "http://localhost:11434"
         self._available = None
+        self._checked_at = 0.0
+        self._models: List[str] = []
+
+    @property
+    def _http(self) -> _KeepAliveClient:
+        with self._clients_lock:
+            client = self._clients.get(self.api_url)
+            if client is None:
+                client = _KeepAliveClient(self.api_url)
+                self._clients[self.api_url] = client
+            return client
 
     def is_available(self) -> bool:
-        if self._available is not None:
+        now = time.monotonic()
+        if self._available is not None and now - self._checked_at < self.AVAILABILITY_TTL:
             return self._available
+        self._checked_at = now
 
         try:
             # 检查 Ollama 服务是否运行
-            req = urllib.request.Request(f"{self.api_url}/api/tags", method='GET')
-            with urllib.request.urlopen(req, timeout=2) as response:
-                if response.status == 200:
-                    self.logger.info("Ollama 服务可用")
-                    self._available = True
-                    return True
-        except (urllib.error.URLError, TimeoutError, ConnectionRefusedError):
+            status, body = self._http.request('GET', '/api/tags', timeout=2)
+            if status == 200:
+                self.logger.info("Ollama 服务可用")
+                self._models = self._parse_models(body)
+                self._available = True
+                return True
+        except (OSError, http.client.HTTPException):
             self.logger.debug("Ollama 服务未运行")
         except Exception as e:
             self.logger.debug(f"检查 Ollama 失败: {e}")
@@ -94,24 +532,31 @@ class OllamaBackend(AIBackend):
         status = {"available": self.is_available(), "installed": shutil.which('ollama') is not None}
 
         if status["available"]:
-            try:
-                req = urllib.request.Request(f"{self.api_url}/api/tags", method='GET')
-                with urllib.request.urlopen(req, timeout=2) as response:
-                    data = json.loads(response.read().decode())
-                    models = [m['name'] for m in data.get('models', [])]
-                    status['models'] = models
-                    if models:
-                        self.model_name = models[0]  # 使用第一个可用模型
-            except Exception:
-                pass
+            # 复用可用性检查时获取的模型列表，不再重复请求 /api/tags
+            models = list(self._models)
+            status['models'] = models
+            if models:
+                self.model_name = models[0]  # 使用第一个可用模型
 
         return status
 
+    @staticmethod
+    def _parse_models(body: bytes) -> List[str]:
+        """从 /api/tags 响应中提取模型名称列表"""
+        try:
+            data = json.loads(body.decode())
+            return [m['name'] for m in data.get('models', [])]
+        except Exception:
+            return []
+
     def load_model(self, model_path: Path) -> bool:
         # Ollama 不需要加载模型文件
         return self.is_available()
 
-    def complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Optional[str]:
+    def _generate(self, prompt: str, max_tokens: int, temperature: float,
+                  on_token: Optional[Callable[[str], None]] = None,
+                  until_json: bool = False) -> Optional[str]:
+        """流式调用 /api/generate，按需在 JSON 对象闭合时提前停止"""
         if not self.is_available():
             return None
 
@@ -119,28 +564,54 @@ class OllamaBackend(AIBackend):
             data = {
                 "model": self.model_name,
                 "prompt": prompt,
-                "stream": False,
+                "stream": True,
                 "options": {
                     "num_predict": max_tokens,
                     "temperature": temperature,
                 }
             }
+            if until_json:
+                data["format"] = "json"
+
+            parts = []
+            tracker = _JsonObjectTracker() if until_json else None
+            for line in self._http.stream_lines(
+                'POST', '/api/generate',
+                body=json.dumps(data).encode('utf-8'),
+                timeout=60
+            ):
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                text = chunk.get('response', '')
+                if text:
+                    parts.append(text)
+                    # 回调返回 False 表示调用方要求停止生成
+                    if on_token and on_token(text) is False:
+                        break
+                    if tracker and tracker.feed(text):
+                        break
+                if chunk.get('done'):
+                    break
 
-            req = urllib.request.Request(
-                f"{self.api_url}/api/generate",
-                data=json.dumps(data).encode('utf-8'),
-                headers={'Content-Type': 'application/json'},
-                method='POST'
-            )
-
-            with urllib.request.urlopen(req, timeout=60) as response:
-                result = json.loads(response.read().decode())
-                return result.get('response', '').strip()
+            return ''.join(parts).strip()
 
         except Exception as e:
             self.logger.error(f"Ollama 推理失败: {e}")
             return None
 
+    def complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Optional[str]:
+        return self._generate(prompt, max_tokens, temperature)
+
+    def stream_complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        return self._generate(prompt, max_tokens, temperature, on_token=on_token)
+
+    def complete_json(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                      grammar: Optional[str] = None) -> Optional[str]:
+        # Ollama 不支持 GBNF，使用其 JSON 模式约束输出
+        return self._generate(prompt, max_tokens, temperature, until_json=True)
+
 
 class LlamaCppPythonBackend(AIBackend):
     """llama-cpp-python 后端"""
@@ -149,184 +620,585 @@ class LlamaCppPythonBackend(AIBackend):
         super().__init__(config)
         self.model = None
         self.gpu_info = None
+        self._grammars: Dict[str, Any] = {}
+        # 固定提示词前缀: (前缀文本, token 列表, 计算完前缀后保存的模型状态)
+        self._prefix_states: List[Tuple[str, List[int], Any]] = []
+        # Llama 实例不是线程安全的，生成、分词和前缀计算串行进行
+        # （停止生成后新的请求会在这里等到上一次生成真正结束）
+        self._model_lock = threading.RLock()
 
     def is_available(self) -> bool:
-        try:
-            import llama_cpp
+        if _llama_cpp_installed():
             return True
-        except ImportError:
-            self.logger.info("llama-cpp-python 未安装")
-            return False
+        self.logger.info("llama-cpp-python 未安装")
+        return False
 
     def _detect_gpu(self) -> dict:
-        """检测可用的GPU"""
-        gpu_info = {
-            'available': False,
-            'type': None,
-            'device_count': 0,
-            'n_gpu_layers': -1
-        }
+        """检测可用的GPU（结果在进程内和磁盘上缓存）"""
+        return dict(_detect_gpu_cached())
+
+    # GGUF general.file_type 中未量化的类型：F32、F16、BF16
+    UNQUANTIZED_FILE_TYPES = {'0', '1', '32'}
+
+    # GGUF general.file_type 对应的量化级别名称（仅用于日志）
+    FILE_TYPE_NAMES = {
+        '0': 'F32', '1': 'F16', '2': 'Q4_0', '3': 'Q4_1', '7': 'Q8_0',
+        '8': 'Q5_0', '9': 'Q5_1', '10': 'Q2_K', '11': 'Q3_K_S', '12': 'Q3_K_M',
+        '13': 'Q3_K_L', '14': 'Q4_K_S', '15': 'Q4_K_M', '16': 'Q5_K_S',
+        '17': 'Q5_K_M', '18': 'Q6_K', '32': 'BF16',
+    }
 
+    def load_model(self, model_path: Path) -> bool:
         try:
-            result = subprocess.run(['nvidia-smi', '--query-gpu=name', '--format=csv,noheader'],
-                                  capture_output=True, text=True, timeout=2)
-            if result.returncode == 0 and result.stdout.strip():
-                gpu_info['available'] = True
-                gpu_info['type'] = 'cuda'
-                gpu_info['device_count'] = len(result.stdout.strip().split('\n'))
-                self.logger.info(f"检测到NVIDIA GPU")
-                return gpu_info
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
+            from llama_cpp import Llama
 
-        try:
-            import platform
-            if platform.machine() == 'arm64':
-                result = subprocess.run(['system_profiler', 'SPDisplaysDataType'],
-                                      capture_output=True, text=True, timeout=2)
-                if 'Metal' in result.stdout or 'Apple GPU' in result.stdout:
-                    gpu_info['available'] = True
-                    gpu_info['type'] = 'metal'
-                    self.logger.info("检测到Apple Silicon GPU (Metal)")
-                    return gpu_info
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            pass
+            # 优先使用之前量化好的模型
+            quantized_path = self._quantized_path(model_path)
+            if quantized_path.exists():
+                model_path = quantized_path
 
-        return gpu_info
+            self.logger.info(f"加载 AI 模型: {model_path}")
+            self._prefix_states = []
+            self.model = self._create_model(Llama, model_path)
+
+            if (self.config.ai.auto_quantize and model_path != quantized_path
+                    and self.model.metadata.get('general.file_type') in self.UNQUANTIZED_FILE_TYPES):
+                if self._quantize(model_path, quantized_path):
+                    self.model = None
+                    self.model = self._create_model(Llama, quantized_path)
+
+            file_type = self.model.metadata.get('general.file_type')
+            quant = self.FILE_TYPE_NAMES.get(file_type, file_type or '未知')
+            self.logger.info(f"AI 模型加载成功 (权重: {quant})")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"加载 AI 模型失败: {e}")
+            return False
+
+    def _create_model(self, llama_class, model_path: Path):
+        """创建 Llama 实例，量化 KV 缓存不被支持时回退到默认 KV 缓存"""
+        model_params = self._prepare_model_params(model_path)
+        kv_params = self._kv_cache_params()
+        if not kv_params:
+            return llama_class(**model_params)
 
-    def load_model(self, model_path: Path) -> bool:
         try:
-            from llama_cpp import Llama
+            model = llama_class(**model_params, **kv_params)
+            self.logger.info(f"KV 缓存类型: {self.config.ai.kv_cache_type}（已启用 flash attention）")
+            return model
+        except Exception as e:
+            self.logger.warning(f"量化 KV 缓存 / flash attention 不可用，使用默认 KV 缓存: {e}")
+            return llama_class(**model_params)
 
-            self.logger.info(f"加载 AI 模型: {model_path}")
-            self.gpu_info = self._detect_gpu()
-
-            model_params = {
-                'model_path': str(model_path),
-                'n_ctx': self.config.ai.context_size,
-                'n_threads': 4,
-                'n_batch': 512,
-                'verbose': False,
-            }
+    def _kv_cache_params(self) -> Dict[str, Any]:
+        """KV 缓存量化参数，默认 f16 时不设置（V 缓存量化需要 flash attention，仅此时启用）"""
+        cache_type = (self.config.ai.kv_cache_type or '').lower()
+        if not cache_type or cache_type == 'f16':
+            return {}
+
+        import llama_cpp
+
+        ggml_type = getattr(llama_cpp, f'GGML_TYPE_{cache_type.upper()}', None)
+        if ggml_type is None:
+            self.logger.warning(f"不支持的 KV 缓存类型: {cache_type}")
+            return {}
+
+        return {'flash_attn': True, 'type_k': ggml_type, 'type_v': ggml_type}
+
+    @staticmethod
+    def _quantized_path(model_path: Path) -> Path:
+        """量化模型的保存路径（与原模型同目录）"""
+        if model_path.name.endswith('.Q4_K_M.gguf'):
+            return model_path
+        return model_path.with_suffix('.Q4_K_M.gguf')
+
+    def _quantize(self, src_path: Path, dst_path: Path) -> bool:
+        """将未量化的模型量化为 Q4_K_M 并保存"""
+        try:
+            import ctypes
+            import llama_cpp
 
-            if self.gpu_info['available']:
-                model_params['n_gpu_layers'] = self.gpu_info['n_gpu_layers']
-                self.logger.info(f"启用GPU加速 ({self.gpu_info['type']})")
-                if self.gpu_info['type'] == 'metal':
-                    model_params['n_threads'] = 1
+            self.logger.info(f"模型未量化，正在量化为 Q4_K_M: {dst_path}")
+            tmp_path = dst_path.with_name(dst_path.name + '.tmp')
+            params = llama_cpp.llama_model_quantize_default_params()
+            params.ftype = llama_cpp.LLAMA_FTYPE_MOSTLY_Q4_K_M
+            ret = llama_cpp.llama_model_quantize(
+                str(src_path).encode('utf-8'),
+                str(tmp_path).encode('utf-8'),
+                ctypes.byref(params),
+            )
+            if ret != 0:
+                self.logger.warning(f"模型量化失败，返回码: {ret}")
+                tmp_path.unlink(missing_ok=True)
+                return False
 
-            self.model = Llama(**model_params)
-            self.logger.info("AI 模型加载成功")
+            os.replace(tmp_path, dst_path)
+            self.logger.info("模型量化完成")
             return True
 
         except Exception as e:
-            self.logger.error(f"加载 AI 模型失败: {e}")
+            self.logger.warning(f"模型量化失败: {e}")
             return False
 
+    def _prepare_model_params(self, model_path: Path) -> Dict[str, Any]:
+        """准备 Llama 构造参数"""
+        self.gpu_info = self._detect_gpu()
+
+        ai_config = self.config.ai
+        n_threads = ai_config.n_threads or _physical_cpu_count()
+        n_batch = min(ai_config.n_batch, ai_config.context_size)
+
+        model_params = {
+            'model_path': str(model_path),
+            'n_ctx': ai_config.context_size,
+            'n_threads': n_threads,
+            'n_threads_batch': n_threads,
+            'n_batch': n_batch,
+            'n_ubatch': min(ai_config.n_ubatch, n_batch),
+            'verbose': False,
+        }
+
+        if self.gpu_info['available']:
+            # 部分版本把 -1 当作 0 处理，显式给出足够大的层数以卸载全部层
+            model_params['n_gpu_layers'] = _GPU_OFFLOAD_LAYERS
+            self.logger.info(f"启用GPU加速 ({self.gpu_info['type']})")
+            if self.gpu_info['type'] == 'cuda':
+                model_params['main_gpu'] = 0
+                model_params['offload_kqv'] = True
+
+        return model_params
+
     def complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Optional[str]:
         if not self.model:
             return None
 
         try:
-            response = self.model.create_completion(
-                prompt,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stop=["\n\n", "```"],
-                echo=False,
-            )
-            if response:
-                return response['choices'][0]['text'].strip()
+            with self._model_lock:
+                self._restore_prefix(prompt)
+                response = self.model.create_completion(
+                    prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stop=["\n\n", "```"],
+                    echo=False,
+                )
+                if response:
+                    return response['choices'][0]['text'].strip()
+        except Exception as e:
+            self.logger.error(f"AI 推理失败: {e}")
+        return None
+
+    def complete_json(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                      grammar: Optional[str] = None) -> Optional[str]:
+        if not self.model or not grammar:
+            return self.complete(prompt, max_tokens=max_tokens, temperature=temperature)
+
+        try:
+            with self._model_lock:
+                self._restore_prefix(prompt)
+                response = self.model.create_completion(
+                    prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    grammar=self._compiled_grammar(grammar),
+                    echo=False,
+                )
+                if response:
+                    return response['choices'][0]['text'].strip()
+        except Exception as e:
+            self.logger.error(f"AI 推理失败: {e}")
+        return None
+
+    def _compiled_grammar(self, grammar: str):
+        """解析 GBNF 语法（同一语法只解析一次）"""
+        compiled = self._grammars.get(grammar)
+        if compiled is None:
+            from llama_cpp import LlamaGrammar
+            compiled = LlamaGrammar.from_string(grammar, verbose=False)
+            self._grammars[grammar] = compiled
+        return compiled
+
+    def stream_complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        if not self.model:
+            return None
+
+        try:
+            with self._model_lock:
+                self._restore_prefix(prompt)
+                parts = []
+                for chunk in self.model.create_completion(
+                    prompt,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stop=["\n\n", "```"],
+                    echo=False,
+                    stream=True,
+                ):
+                    text = chunk['choices'][0]['text']
+                    if text:
+                        parts.append(text)
+                        # 回调返回 False 表示调用方要求停止生成
+                        if on_token and on_token(text) is False:
+                            break
+                return ''.join(parts).strip()
         except Exception as e:
             self.logger.error(f"AI 推理失败: {e}")
         return None
 
+    def warm_prefix(self, prefix: str) -> None:
+        """计算固定前缀并保存一份模型状态，后续同前缀的提示词恢复该状态后只需计算剩余部分"""
+        if not self.model:
+            return
+
+        try:
+            with self._model_lock:
+                tokens = self.model.tokenize(prefix.encode('utf-8'))
+                self.model.reset()
+                self.model.eval(tokens)
+                self._prefix_states.append((prefix, tokens, self.model.save_state()))
+            self.logger.debug(f"已保存提示词前缀状态: {len(tokens)} tokens")
+        except Exception as e:
+            self.logger.warning(f"保存提示词前缀状态失败: {e}")
+
+    def _restore_prefix(self, prompt: str) -> None:
+        """提示词以已保存的前缀开头时恢复前缀状态，create_completion 会跳过已计算的前缀 token"""
+        for prefix, tokens, state in self._prefix_states:
+            if not prompt.startswith(prefix):
+                continue
+            # 上一次调用使用的是同一前缀时，模型中已有这些 token，无需恢复
+            n = len(tokens)
+            if self.model.n_tokens < n or self.model.input_ids[:n].tolist() != tokens:
+                self.model.load_state(state)
+            return
+
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """用模型自身的分词器截断文本，保证提示词不超出上下文"""
+        if not self.model:
+            return text
+
+        try:
+            with self._model_lock:
+                tokens = self.model.tokenize(text.encode('utf-8'), add_bos=False)
+                if len(tokens) <= max_tokens:
+                    return text
+                return self.model.detokenize(tokens[:max(max_tokens, 0)]).decode('utf-8', errors='ignore')
+        except Exception as e:
+            self.logger.debug(f"按 token 截断失败: {e}")
+            return text
+
     def close(self):
-        self.model = None
+        with self._model_lock:
+            self._prefix_states = []
+            self.model = None
 
 
 class LlamaCliBackend(AIBackend):
     """llama.cpp CLI 后端 - 通过命令行调用"""
 
+    # 等待 llama-server 加载模型的最长时间（秒）
+    SERVER_START_TIMEOUT = 120
+
+    # 单次 CLI 调用的最长时间（秒）
+    CLI_TIMEOUT = 60
+
     def __init__(self, config):
         super().__init__(config)
         self.model_path = None
         self.cli_path = None
+        self.server_path = None
+        self._server: Optional[subprocess.Popen] = None
+        self._server_http: Optional[_KeepAliveClient] = None
         self._find_llama_cli()
 
     def _find_llama_cli(self):
         """查找 llama.cpp 可执行文件"""
-        candidates = ['llama-cli', 'main', 'llama']
-
-        # 检查 PATH
-        for cmd in candidates:
-            if shutil.which(cmd):
-                self.cli_path = shutil.which(cmd)
-                self.logger.info(f"找到 llama.cpp CLI: {self.cli_path}")
-                return
-
-        # 检查常见位置
-        common_paths = [
-            Path.home() / '.local' / 'bin',
-            Path('/usr/local/bin'),
-            Path('/usr/bin'),
-        ]
-
-        for path in common_paths:
-            for cmd in candidates:
-                cli_file = path / cmd
-                if cli_file.exists():
-                    self.cli_path = str(cli_file)
-                    self.logger.info(f"找到 llama.cpp CLI: {self.cli_path}")
-                    return
+        self.cli_path = _locate_llama_cli()
+        self.server_path = _locate_llama_server()
+        if self.cli_path:
+            self.logger.info(f"找到 llama.cpp CLI: {self.cli_path}")
+        if self.server_path:
+            self.logger.info(f"找到 llama.cpp 服务: {self.server_path}")
 
     def is_available(self) -> bool:
-        if self.cli_path:
+        if self.cli_path or self.server_path:
             return True
         self.logger.info("llama.cpp CLI 未找到")
         return False
 
     def load_model(self, model_path: Path) -> bool:
-        if not self.cli_path:
+        if not self.cli_path and not self.server_path:
             return False
         self.model_path = model_path
+
+        # 优先启动常驻的 llama-server，模型只加载一次
+        if self.server_path and self._start_server(model_path):
+            return True
+
+        if not self.cli_path:
+            return False
         self.logger.info(f"配置 llama.cpp CLI 使用模型: {model_path}")
         return True
 
-    def complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Optional[str]:
-        if not self.cli_path or not self.model_path:
-            return None
+    @staticmethod
+    def _free_port() -> int:
+        """获取一个空闲的本地端口"""
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.bind(('127.0.0.1', 0))
+            return sock.getsockname()[1]
+
+    def _start_server(self, model_path: Path) -> bool:
+        """启动 llama-server 并等待模型加载完成"""
+        self._stop_server()
+
+        port = self._free_port()
+        cmd = [
+            self.server_path,
+            '-m', str(model_path),
+            '-c', str(self.config.ai.context_size),
+            '--host', '127.0.0.1',
+            '--port', str(port),
+        ]
 
-        try:
-            cmd = [
-                self.cli_path,
-                '-m', str(self.model_path),
-                '-p', prompt,
-                '-n', str(max_tokens),
-                '--temp', str(temperature),
-                '--no-display-prompt',
-                '-c', str(self.config.ai.context_size),
-            ]
+        # 有 GPU 时将全部层卸载到 GPU
+        gpu_info = _detect_gpu_cached()
+        if gpu_info['available']:
+            cmd += ['-ngl', str(_GPU_OFFLOAD_LAYERS)]
+            self.logger.info(f"llama.cpp 服务启用GPU加速 ({gpu_info['type']})")
 
-            result = subprocess.run(
+        try:
+            self.logger.info(f"启动 llama.cpp 服务: 127.0.0.1:{port}")
+            self._server = subprocess.Popen(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=60
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
             )
+        except Exception as e:
+            self.logger.warning(f"启动 llama.cpp 服务失败: {e}")
+            self._server = None
+            return False
 
-            if result.returncode == 0:
-                return result.stdout.strip()
-            else:
-                self.logger.error(f"llama.cpp CLI 错误: {result.stderr}")
+        http_client = _KeepAliveClient(f"http://127.0.0.1:{port}")
+        deadline = time.monotonic() + self.SERVER_START_TIMEOUT
+        while time.monotonic() < deadline:
+            if self._server.poll() is not None:
+                self.logger.warning(f"llama.cpp 服务意外退出，返回码: {self._server.returncode}")
+                self._server = None
+                return False
+            try:
+                # 模型加载期间 /health 返回 503
+                status, _ = http_client.request('GET', '/health', timeout=2)
+                if status == 200:
+                    self._server_http = http_client
+                    self.logger.info("llama.cpp 服务已就绪")
+                    return True
+            except (OSError, http.client.HTTPException):
+                pass
+            time.sleep(0.2)
 
+        self.logger.warning("等待 llama.cpp 服务就绪超时")
+        self._stop_server()
+        return False
+
+    def _stop_server(self) -> None:
+        """停止 llama-server 进程"""
+        self._server_http = None
+        server, self._server = self._server, None
+        if server is None or server.poll() is not None:
+            return
+        server.terminate()
+        try:
+            server.wait(timeout=5)
         except subprocess.TimeoutExpired:
-            self.logger.error("llama.cpp CLI 超时")
+            server.kill()
+            server.wait()
+
+    def warm_prefix(self, prefix: str) -> None:
+        """让 llama-server 预先计算固定前缀，后续请求可直接复用其 KV 缓存"""
+        if not self._server_http:
+            return
+
+        payload = json.dumps({'prompt': prefix, 'n_predict': 0, 'cache_prompt': True}).encode('utf-8')
+        try:
+            self._server_http.request('POST', '/completion', body=payload, timeout=60)
+        except Exception as e:
+            self.logger.warning(f"缓存提示词前缀失败: {e}")
+
+    def truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """通过 llama-server 的 /tokenize 和 /detokenize 按 token 数截断文本"""
+        if not self._server_http:
+            return text
+
+        try:
+            payload = json.dumps({'content': text}).encode('utf-8')
+            status, body = self._server_http.request('POST', '/tokenize', body=payload, timeout=10)
+            if status != 200:
+                return text
+            tokens = json.loads(body.decode('utf-8')).get('tokens', [])
+            if len(tokens) <= max_tokens:
+                return text
+
+            payload = json.dumps({'tokens': tokens[:max(max_tokens, 0)]}).encode('utf-8')
+            status, body = self._server_http.request('POST', '/detokenize', body=payload, timeout=10)
+            if status == 200:
+                return json.loads(body.decode('utf-8')).get('content', text)
+        except Exception as e:
+            self.logger.debug(f"按 token 截断失败: {e}")
+        return text
+
+    @staticmethod
+    def _server_request(prompt: str, max_tokens: int, temperature: float,
+                        grammar: Optional[str] = None, stream: bool = False) -> bytes:
+        """构造 llama-server /completion 请求体"""
+        data = {
+            'prompt': prompt,
+            'n_predict': max_tokens,
+            'temperature': temperature,
+            'stop': ["\n\n", "```"],
+            # 复用槽位中与上一次相同的提示词前缀，只需计算变化的部分
+            'cache_prompt': True,
+        }
+        if grammar:
+            data['grammar'] = grammar
+        if stream:
+            data['stream'] = True
+        return json.dumps(data).encode('utf-8')
+
+    def _server_complete(self, prompt: str, max_tokens: int, temperature: float,
+                         grammar: Optional[str] = None) -> Optional[str]:
+        """通过常驻的 llama-server 生成"""
+        payload = self._server_request(prompt, max_tokens, temperature, grammar=grammar)
+
+        try:
+            status, body = self._server_http.request('POST', '/completion', body=payload, timeout=60)
+            if status == 200:
+                return json.loads(body.decode('utf-8')).get('content', '').strip()
+            self.logger.error(f"llama.cpp 服务错误: HTTP {status}")
+        except Exception as e:
+            self.logger.error(f"llama.cpp 服务请求失败: {e}")
+        return None
+
+    def _server_stream(self, prompt: str, max_tokens: int, temperature: float,
+                       on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """通过 llama-server 流式生成（SSE），回调要求停止时断开连接，服务端随之停止生成"""
+        payload = self._server_request(prompt, max_tokens, temperature, stream=True)
+
+        try:
+            parts = []
+            lines = self._server_http.stream_lines('POST', '/completion', body=payload, timeout=60)
+            try:
+                for line in lines:
+                    # 每个事件形如 "data: {...}"，事件之间以空行分隔
+                    if not line.startswith(b'data:'):
+                        continue
+                    chunk = json.loads(line[5:])
+                    text = chunk.get('content', '')
+                    if text:
+                        parts.append(text)
+                        # 回调返回 False 表示调用方要求停止生成
+                        if on_token and on_token(text) is False:
+                            break
+            finally:
+                lines.close()
+            return ''.join(parts).strip()
+        except Exception as e:
+            self.logger.error(f"llama.cpp 服务请求失败: {e}")
+        return None
+
+    def complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7) -> Optional[str]:
+        if self._server_http:
+            return self._server_complete(prompt, max_tokens, temperature)
+        return self._cli_generate(prompt, max_tokens, temperature)
+
+    def stream_complete(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                        on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        if self._server_http:
+            return self._server_stream(prompt, max_tokens, temperature, on_token=on_token)
+        return self._cli_generate(prompt, max_tokens, temperature, on_token=on_token)
+
+    def complete_json(self, prompt: str, max_tokens: int = 256, temperature: float = 0.7,
+                      grammar: Optional[str] = None) -> Optional[str]:
+        if self._server_http:
+            return self._server_complete(prompt, max_tokens, temperature, grammar=grammar)
+        return self._cli_generate(prompt, max_tokens, temperature, until_json=True, grammar=grammar)
+
+    def _cli_generate(self, prompt: str, max_tokens: int, temperature: float,
+                      on_token: Optional[Callable[[str], None]] = None,
+                      until_json: bool = False,
+                      grammar: Optional[str] = None) -> Optional[str]:
+        """边运行 llama.cpp CLI 边读取输出，按需在 JSON 对象闭合时提前结束进程"""
+        if not self.cli_path or not self.model_path:
+            return None
+
+        cmd = [
+            self.cli_path,
+            '-m', str(self.model_path),
+            '-p', prompt,
+            '-n', str(max_tokens),
+            '--temp', str(temperature),
+            '--no-display-prompt',
+            '-c', str(self.config.ai.context_size),
+        ]
+        if grammar:
+            cmd += ['--grammar', grammar]
+
+        try:
+            # stderr 写入临时文件，避免日志输出填满管道导致进程阻塞
+            with tempfile.TemporaryFile() as stderr_file:
+                proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL,
+                                        stdout=subprocess.PIPE, stderr=stderr_file)
+                timed_out = threading.Event()
+
+                def kill_on_timeout():
+                    timed_out.set()
+                    proc.kill()
+
+                timer = threading.Timer(self.CLI_TIMEOUT, kill_on_timeout)
+                timer.start()
+
+                parts = []
+                tracker = _JsonObjectTracker() if until_json else None
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                stopped_early = False
+                try:
+                    while True:
+                        data = proc.stdout.read1(4096)
+                        text = decoder.decode(data, final=not data)
+                        if text:
+                            parts.append(text)
+                            # 回调返回 False 表示调用方要求停止生成
+                            if ((on_token and on_token(text) is False)
+                                    or (tracker and tracker.feed(text))):
+                                stopped_early = True
+                                break
+                        if not data:
+                            break
+                finally:
+                    timer.cancel()
+                    if proc.poll() is None:
+                        proc.kill()
+                    proc.stdout.close()
+                    returncode = proc.wait()
+
+                if stopped_early or returncode == 0:
+                    return ''.join(parts).strip()
+                if timed_out.is_set():
+                    self.logger.error("llama.cpp CLI 超时")
+                else:
+                    stderr_file.seek(0)
+                    stderr = stderr_file.read().decode('utf-8', errors='replace')
+                    self.logger.error(f"llama.cpp CLI 错误: {stderr}")
+
         except Exception as e:
             self.logger.error(f"llama.cpp CLI 执行失败: {e}")
 
         return None
 
+    def close(self):
+        self._stop_server()
+
 
 class SimpleBackend(AIBackend):
     """智能后端 - 使用规则匹配和启发式方法，无需AI模型"""
@@ -400,26 +1272,37 @@ class SimpleBackend(AIBackend):
 
     def parse_query(self, query: str) -> QueryAnalysis:
         """智能解析查询"""
-        query_lower = query.lower()
-        keywords = []
         filters = {}
         intent_parts = []
 
-        # 提取文件类型
-        detected_extensions = []
-        for ext, keywords_list in self.FILE_TYPE_KEYWORDS.items():
-            for kw in keywords_list:
-                if kw.lower() in query_lower:
-                    detected_extensions.append(ext)
-                    break
+        # 一次扫描找出所有特殊词汇，同时拼出去掉这些词汇后的剩余文本
+        ext_hits = set()
+        time_hits = set()
+        size_hits = set()
+        remainder = []
+        last_end = 0
+        for match in _RE_SIMPLE_KEYWORDS.finditer(query):
+            remainder.append(query[last_end:match.start()])
+            last_end = match.end()
+            for kind, value in _SIMPLE_KEYWORD_TABLE.get(match.group(0).lower(), ()):
+                if kind == 'ext':
+                    ext_hits.add(value)
+                elif kind == 'time':
+                    time_hits.add(value)
+                else:
+                    size_hits.add(value)
+        remainder.append(query[last_end:])
+        clean_query = ''.join(remainder)
 
+        # 提取文件类型
+        detected_extensions = [ext for ext in self.FILE_TYPE_KEYWORDS if ext in ext_hits]
         if detected_extensions:
-            filters['extensions'] = list(set(detected_extensions))
+            filters['extensions'] = detected_extensions
             intent_parts.append(f"文件类型: {', '.join(detected_extensions)}")
 
         # 提取时间范围
         for time_kw, days in self.TIME_KEYWORDS.items():
-            if time_kw in query:
+            if time_kw in time_hits:
                 from datetime import date, timedelta
                 filters['modified_after'] = date.today() - timedelta(days=days)
                 intent_parts.append(f"时间: {time_kw}")
@@ -427,25 +1310,14 @@ class SimpleBackend(AIBackend):
 
         # 提取大小条件
         for size_kw, size_mb in self.SIZE_KEYWORDS.items():
-            if size_kw in query:
+            if size_kw in size_hits:
                 if size_mb > 0:
                     filters['min_size'] = size_mb * 1024 * 1024
                 intent_parts.append(f"大小: {size_kw}")
                 break
 
-        # 提取关键词（中文、英文、数字）
-        # 移除已识别的特殊词汇
-        clean_query = query
-        for ext_list in self.FILE_TYPE_KEYWORDS.values():
-            for kw in ext_list:
-                clean_query = clean_query.replace(kw, '')
-        for time_kw in self.TIME_KEYWORDS:
-            clean_query = clean_query.replace(time_kw, '')
-        for size_kw in self.SIZE_KEYWORDS:
-            clean_query = clean_query.replace(size_kw, '')
-
         # 提取剩余关键词
-        keywords = re.findall(r'[\u4e00-\u9fff\w]{2,}', clean_query)
+        keywords = _extract_keywords(clean_query)
 
         # 构建意图描述
         if intent_parts:
@@ -463,6 +1335,55 @@ class SimpleBackend(AIBackend):
         )
 
 
+def _compile_template(template: str) -> List[Tuple[str, Optional[str]]]:
+    """把 str.format 风格模板预先拆成 (字面文本, 占位符名) 序列"""
+    try:
+        return [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+    except ValueError:
+        # 模板中有未转义的花括号，按纯文本处理
+        return [(template, None)]
+
+
+def _render_template(parts: List[Tuple[str, Optional[str]]], **values: str) -> str:
+    """用预先拆好的模板片段拼接提示词"""
+    return ''.join([literal + values.get(field, '') if field else literal
+                    for literal, field in parts])
+
+
+def _build_simple_keyword_matcher():
+    """构建 小写关键词 -> [(类别, 值)] 表，以及匹配所有关键词的单个正则"""
+    table: Dict[str, List[Tuple[str, Any]]] = {}
+    for ext, kws in SimpleBackend.FILE_TYPE_KEYWORDS.items():
+        for kw in kws:
+            table.setdefault(kw.lower(), []).append(('ext', ext))
+    for time_kw in SimpleBackend.TIME_KEYWORDS:
+        table.setdefault(time_kw.lower(), []).append(('time', time_kw))
+    for size_kw in SimpleBackend.SIZE_KEYWORDS:
+        table.setdefault(size_kw.lower(), []).append(('size', size_kw))
+
+    # 长词优先，保证 "word文档" 不会被拆成 "word"
+    alternation = '|'.join(re.escape(kw) for kw in sorted(table, key=len, reverse=True))
+    return table, re.compile(alternation, re.IGNORECASE)
+
+
+_SIMPLE_KEYWORD_TABLE, _RE_SIMPLE_KEYWORDS = _build_simple_keyword_matcher()
+
+# 从 GGUF 文件名中识别量化级别，数值越小越优先（解码受内存带宽限制，权重越小越快）
+_RE_MODEL_QUANT = re.compile(r'(Q\d_K_[MS]|Q\d_K|Q\d_\d|BF16|F16|F32)', re.IGNORECASE)
+_MODEL_QUANT_RANK = {
+    'Q4_K_M': 0, 'Q5_K_M': 1, 'Q6_K': 2, 'Q4_K_S': 3, 'Q5_K_S': 4, 'Q4_0': 5,
+    'Q8_0': 9, 'BF16': 10, 'F16': 10, 'F32': 11,
+}
+_MODEL_QUANT_RANK_UNKNOWN = 8
+
+# 已解析的模型路径（(配置路径, 是否打包, 打包目录) -> 模型文件）
+_resolved_model_paths: Dict[Tuple[str, bool, Optional[str]], Path] = {}
+
+# 进程内共享的后端探测实例（后端 ID -> 后端实例），供 get_available_backends 复用
+_backend_probes: Dict[str, AIBackend] = {}
+_backend_probes_lock = threading.Lock()
+
+
 class AIEngine:
     """AI 引擎 - 支持多种后端"""
 
@@ -480,17 +1401,93 @@ class AIEngine:
         self.backend = None
         self.model_loaded = False
         self.enabled = self.config.ai.enabled
-        self.backend_type = "none"
-
-        # 线程池（用于异步处理）
-        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._backend_type = "none"
+        self._backend_ready = threading.Event()
+        # 后端探测完成时的回调（在后台线程中调用，参数为后端名称）
+        self._backend_ready_callbacks: List[Callable[[str], None]] = []
+
+        # 线程池（用于异步处理），首次提交任务时才创建
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+        # 后台模型加载任务；加载进行中被关闭时，由加载任务结束后自行释放后端
+        self._load_future = None
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._closed = False
+
+        # 规则匹配回退解析器（按需创建）
+        self._simple_backend: Optional[SimpleBackend] = None
+
+        # 查询解析缓存（(查询字符串, 是否使用模型, 日期) -> QueryAnalysis）
+        self._parse_cache: "OrderedDict[Tuple[str, bool, date], QueryAnalysis]" = OrderedDict()
+        self._parse_cache_lock = threading.Lock()
+        self._parse_cache_size = 256
+
+        # 低温度生成结果缓存（(提示词, max_tokens, temperature) -> 回复）
+        self._completion_cache: "OrderedDict[Tuple[str, int, float], str]" = OrderedDict()
+        self._completion_cache_lock = threading.Lock()
+        self._completion_cache_size = 512
+
+        # 初始化提示词模板（后台加载模型时需要用到）
+        self._init_prompt_templates()
 
-        # 初始化后端
+        # 在后台线程中探测后端并加载模型，不阻塞启动
         if self.enabled:
-            self._init_backend()
+            self._loading = True
+            self._load_future = self._submit(self._init_backend_and_model)
+        else:
+            self._backend_ready.set()
 
-        # 初始化提示词模板
-        self._init_prompt_templates()
+    @property
+    def backend_type(self) -> str:
+        """当前使用的后端名称，后台探测未完成时返回 'pending'（不阻塞调用线程）"""
+        if not self._backend_ready.is_set():
+            return "pending"
+        return self._backend_type
+
+    def on_backend_ready(self, callback: Callable[[str], None]) -> None:
+        """
+        注册后端探测完成的回调
+
+        探测已完成时立即在当前线程调用，否则在后台探测线程中调用；
+        界面代码应通过信号转到主线程再更新控件。
+        """
+        with self._load_lock:
+            if not self._backend_ready.is_set():
+                self._backend_ready_callbacks.append(callback)
+                return
+        callback(self._backend_type)
+
+    def _mark_backend_ready(self) -> None:
+        """标记后端探测完成并通知已注册的回调"""
+        with self._load_lock:
+            self._backend_ready.set()
+            callbacks, self._backend_ready_callbacks = self._backend_ready_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self._backend_type)
+            except Exception as e:
+                self.logger.warning(f"后端就绪回调失败: {e}")
+
+    def _init_backend_and_model(self) -> bool:
+        """后台任务：探测可用后端，必要时加载模型"""
+        try:
+            try:
+                self._init_backend()
+            finally:
+                self._mark_backend_ready()
+            # 探测期间引擎已被关闭，不再加载模型
+            if self._closed:
+                return False
+            return self._load_model()
+        finally:
+            with self._load_lock:
+                self._loading = False
+                closed = self._closed
+            if closed:
+                self.logger.info("AI 引擎已在加载期间关闭，释放后端")
+                self.model_loaded = False
+                self._release_backend()
 
     def _init_backend(self):
         """初始化 AI 后端"""
@@ -501,26 +1498,51 @@ class AIEngine:
             ("llama.cpp-cli", LlamaCliBackend),
         ]
 
-        for name, backend_class in backends:
-            try:
-                backend = backend_class(self.config)
-                if backend.is_available():
-                    self.backend = backend
-                    self.backend_type = name
-                    self.logger.info(f"使用 AI 后端: {name}")
-                    return
-            except Exception as e:
-                self.logger.warning(f"初始化后端 {name} 失败: {e}")
+        # 各后端的探测互不相关（HTTP 请求、模块查找、PATH 扫描），并行进行，
+        # 再按优先级取第一个可用的后端，不必等待优先级更低的探测结束
+        pool = ThreadPoolExecutor(max_workers=len(backends), thread_name_prefix='ai_probe')
+        futures = [(name, pool.submit(self._try_backend, name, backend_class))
+                   for name, backend_class in backends]
+        pool.shutdown(wait=False)
+
+        for name, future in futures:
+            backend = future.result()
+            if backend is not None:
+                self.backend = backend
+                self._backend_type = name
+                self.logger.info(f"使用 AI 后端: {name}")
+                return
 
         # 回退到智能后端（始终可用）
         self.backend = SimpleBackend(self.config)
-        self.backend_type = "simple"
+        self._backend_type = "simple"
         self.logger.info("AI 后端不可用，使用智能匹配模式")
 
-    def _resolve_model_path(self) -> Optional[Path]:
-        """解析模型路径"""
-        import sys
+    def _try_backend(self, name: str, backend_class) -> Optional[AIBackend]:
+        """创建后端并检查是否可用，不可用时返回 None"""
+        try:
+            backend = backend_class(self.config)
+            if backend.is_available():
+                return backend
+        except Exception as e:
+            self.logger.warning(f"初始化后端 {name} 失败: {e}")
+        return None
 
+    def _resolve_model_path(self) -> Optional[Path]:
+        """解析模型路径（成功结果在进程内缓存，命中时只需确认文件仍然存在）"""
+        frozen = getattr(sys, 'frozen', False)
+        cache_key = (self.config.ai.model_path, frozen, getattr(sys, '_MEIPASS', None))
+        cached = _resolved_model_paths.get(cache_key)
+        if cached is not None and cached.is_file():
+            return cached
+
+        resolved = self._find_model_path()
+        if resolved is not None:
+            _resolved_model_paths[cache_key] = resolved
+        return resolved
+
+    def _find_model_path(self) -> Optional[Path]:
+        """在候选位置中查找模型文件"""
         config_path = Path(self.config.ai.model_path).expanduser()
         candidates = []
 
@@ -543,20 +1565,88 @@ class AIEngine:
                 ])
             candidates.append(config_path)
 
+        # 每个目录只列举一次，用文件名集合判断候选是否存在
+        dir_files: Dict[Path, Dict[str, str]] = {}
         for path in candidates:
-            if path.exists() and path.is_file():
-                self.logger.info(f"找到模型文件: {path}")
-                return path
+            parent = path.parent
+            files = dir_files.get(parent)
+            if files is None:
+                files = {}
+                try:
+                    with os.scandir(parent) as entries:
+                        for entry in entries:
+                            if entry.is_file():
+                                files[entry.name] = entry.name
+                                files.setdefault(entry.name.lower(), entry.name)
+                except OSError:
+                    pass
+                dir_files[parent] = files
+
+            # 先精确匹配，再按不区分大小写匹配（Windows / macOS 文件系统）
+            name = files.get(path.name) or files.get(path.name.lower())
+            if name:
+                resolved = parent / name
+                self.logger.info(f"找到模型文件: {resolved}")
+                return resolved
+
+        # 配置的模型不存在时，从已列举的目录中挑选量化级别最合适的 GGUF 模型
+        fallback = self._pick_quantized_model(dir_files)
+        if fallback:
+            return fallback
 
         self.logger.warning(f"模型文件未找到")
         return None
 
+    def _pick_quantized_model(self, dir_files: Dict[Path, Dict[str, str]]) -> Optional[Path]:
+        """按量化级别偏好（Q4_K_M 优先）选择目录中的 GGUF 模型"""
+        models = [parent / name
+                  for parent, files in dir_files.items()
+                  for name in set(files.values())
+                  if name.lower().endswith('.gguf')]
+        if not models:
+            return None
+
+        def rank(path: Path) -> Tuple[int, str]:
+            match = _RE_MODEL_QUANT.search(path.name)
+            quant = match.group(1).upper() if match else ''
+            return _MODEL_QUANT_RANK.get(quant, _MODEL_QUANT_RANK_UNKNOWN), path.name
+
+        model = min(models, key=rank)
+        match = _RE_MODEL_QUANT.search(model.name)
+        quant = match.group(1).upper() if match else '未知'
+        self.logger.info(f"配置的模型不存在，使用找到的模型: {model} (量化: {quant})")
+        if quant in ('Q8_0', 'F16', 'BF16', 'F32'):
+            self.logger.warning(f"模型量化级别为 {quant}，解码速度明显慢于 Q4_K_M")
+        return model
+
+    def _submit(self, fn, *args, **kwargs):
+        """提交后台任务，按需创建线程池"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ai_engine')
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def _ensure_loaded(self) -> None:
+        """等待后台后端探测和模型加载完成"""
+        with self._load_lock:
+            future = self._load_future
+        if future is None:
+            return
+
+        try:
+            future.result()
+        except Exception as e:
+            self.logger.error(f"后台加载模型失败: {e}")
+
+        with self._load_lock:
+            if self._load_future is future:
+                self._load_future = None
+
     def _load_model(self) -> bool:
         """加载 AI 模型"""
         if not self.enabled or not self.backend:
             return False
 
-        if self.backend_type in ("simple", "ollama"):
+        if self._backend_type in ("simple", "ollama"):
             return True
 
         model_path = self._resolve_model_path()
@@ -565,111 +1655,168 @@ class AIEngine:
             return False
 
         if self.backend.load_model(model_path):
+            self._warm_prompt_prefixes()
             self.model_loaded = True
             return True
 
         return False
 
+    def _warm_prompt_prefixes(self) -> None:
+        """预先计算固定提示词前缀的 KV 缓存"""
+        for parts in (self._query_analysis_parts, self._answer_parts, self._summary_parts):
+            prefix = parts[0][0] if parts else ''
+            if prefix:
+                self.backend.warm_prefix(prefix)
+
     def _init_prompt_templates(self) -> None:
         """初始化提示词模板"""
+        # 固定的说明文字都放在前面、用户变量放在最后，前缀在每次调用中完全相同，
+        # 后端可以复用前缀的 KV 缓存，只需计算变量部分
         self.query_analysis_template = """分析用户查询，提取搜索关键词和过滤条件。
 
-用户查询：{query}
-
 请输出 JSON 格式：
-{{"keywords": ["关键词"], "filters": {{"extensions": [".pdf"]}}, "intent": "意图", "confidence": 0.9}}"""
+{{"keywords": ["关键词"], "filters": {{"extensions": [".pdf"]}}, "intent": "意图", "confidence": 0.9}}
+
+用户查询：{query}"""
 
         self.answer_template = self.config.ai.prompt_template
-        self.summary_template = """请为以下内容生成摘要：
+        self.summary_template = """请为以下内容生成摘要，不超过100字，只输出摘要本身。
 
-{content}
+内容：
+{content}"""
 
-摘要（不超过100字）："""
+        # 预先拆分模板，调用时直接拼接，无需每次解析格式字符串
+        self._query_analysis_parts = _compile_template(self.query_analysis_template)
+        self._answer_parts = _compile_template(self.answer_template)
+        self._summary_parts = _compile_template(self.summary_template)
 
     def parse_natural_language(self, query: str) -> QueryAnalysis:
         """解析自然语言查询"""
-        if not self.enabled:
-            return self._simple_parse(query)
-
-        # 如果是智能后端，使用其智能解析
-        if self.backend_type == "simple" and isinstance(self.backend, SimpleBackend):
-            return self.backend.parse_query(query)
-
-        if not self.model_loaded:
-            return self._simple_parse(query)
+        use_model = self._use_model()
+
+        # 缓存键区分解析方式，模型结果与规则匹配结果互不混用；
+        # 时间过滤条件按当天日期计算，跨天后缓存自然失效
+        cache_key = (query, use_model, date.today())
+        with self._parse_cache_lock:
+            cached = self._parse_cache.get(cache_key)
+            if cached is not None:
+                self._parse_cache.move_to_end(cache_key)
+                return cached
+
+        # 智能后端、AI 未启用或模型未加载时直接使用规则匹配解析
+        if not use_model:
+            analysis = self._simple_parse(query)
+            self._cache_analysis(cache_key, analysis)
+            return analysis
 
         try:
-            prompt = self.query_analysis_template.format(query=query)
-            response = self.backend.complete(prompt, max_tokens=300, temperature=0.1)
+            prompt = _render_template(self._query_analysis_parts, query=query)
+            response = self.backend.complete_json(prompt, max_tokens=300, temperature=0.1,
+                                                  grammar=_QUERY_ANALYSIS_GRAMMAR)
 
             if response:
-                json_match = re.search(r'\{.*\}', response, re.DOTALL)
+                json_match = _RE_JSON.search(response)
                 if json_match:
                     data = json.loads(json_match.group(0))
-                    return QueryAnalysis(
+                    analysis = QueryAnalysis(
                         keywords=data.get('keywords', []),
                         filters=data.get('filters', {}),
                         intent=data.get('intent', ''),
                         confidence=data.get('confidence', 0.5)
                     )
+                    self._cache_analysis(cache_key, analysis)
+                    return analysis
         except Exception as e:
             self.logger.error(f"AI 解析失败: {e}")
 
+        # 模型解析失败时的回退结果不缓存，下次仍尝试模型
         return self._simple_parse(query)
 
-    def _simple_parse(self, query: str) -> QueryAnalysis:
-        """简单解析（回退方法）"""
-        # 使用智能后端的解析
+    def can_generate(self) -> bool:
+        """模型已加载、可以生成回答（不等待后台加载，供界面判断）"""
+        return self.enabled and self.model_loaded and self._backend_type != "simple"
+
+    def _use_model(self) -> bool:
+        """等待后台加载完成，判断是否可以调用模型生成（智能后端不做文本生成）"""
+        self._ensure_loaded()
+        return self.enabled and self.model_loaded and self._backend_type != "simple"
+
+    def _cache_analysis(self, cache_key: Tuple[str, bool, date], analysis: QueryAnalysis) -> None:
+        """缓存解析结果，超出容量时淘汰最久未使用的条目"""
+        with self._parse_cache_lock:
+            self._parse_cache[cache_key] = analysis
+            self._parse_cache.move_to_end(cache_key)
+            while len(self._parse_cache) > self._parse_cache_size:
+                self._parse_cache.popitem(last=False)
+
+    @property
+    def _simple_fallback(self) -> SimpleBackend:
+        """规则匹配解析器，首次需要回退时创建"""
         if isinstance(self.backend, SimpleBackend):
-            return self.backend.parse_query(query)
-
-        keywords = re.findall(r'[\u4e00-\u9fff\w]{2,}', query)
+            return self.backend
+        if self._simple_backend is None:
+            self._simple_backend = SimpleBackend(self.config)
+        return self._simple_backend
 
-        filters = {}
-        query_lower = query.lower()
-
-        # 检测文件类型
-        for ext, kws in SimpleBackend.FILE_TYPE_KEYWORDS.items():
-            for kw in kws:
-                if kw.lower() in query_lower:
-                    filters['extensions'] = [ext]
-                    break
-            if 'extensions' in filters:
-                break
+    def _simple_parse(self, query: str) -> QueryAnalysis:
+        """简单解析（回退方法）"""
+        return self._simple_fallback.parse_query(query)
 
-        return QueryAnalysis(
-            keywords=keywords,
-            filters=filters,
-            intent=f"搜索: {query}",
-            confidence=0.6
-        )
+    def generate_answer(self, question: str, context_files: List[Dict[str, Any]],
+                        on_token: Optional[Callable[[str], None]] = None,
+                        cancel_event: Optional[threading.Event] = None) -> str:
+        """
+        基于文件内容生成回答
 
-    def generate_answer(self, question: str, context_files: List[Dict[str, Any]]) -> str:
-        """基于文件内容生成回答"""
-        if not self.enabled or not self.model_loaded:
+        Args:
+            question: 用户问题
+            context_files: 相关文件列表
+            on_token: 可选的流式回调，每生成一段文本调用一次
+            cancel_event: 可选的取消标志，设置后停止生成并返回已生成的部分
+        """
+        if not self._use_model():
             return self._simple_answer(question, context_files)
 
         if not context_files:
             return "没有找到相关的文件内容来回答这个问题。"
 
         try:
-            file_context = ""
+            # 每个文件拼成一段再统一 join
+            parts = []
             for i, file in enumerate(context_files[:5], 1):
-                file_context += f"文件 {i}: {file.get('filename', '未知')}\n"
-                if content := file.get('content_preview', ''):
-                    file_context += f"内容: {content[:500]}\n"
-                file_context += "-" * 40 + "\n"
+                preview = file.get('content_preview', '')[:500]
+                content_line = f"内容: {preview}\n" if preview else ""
+                parts.append(f"文件 {i}: {file.get('filename', '未知')}\n{content_line}{_CONTEXT_SEPARATOR}\n")
+            file_context = "".join(parts)
 
-            prompt = self.answer_template.format(
+            prompt = _render_template(
+                self._answer_parts,
                 file_context=file_context,
                 question=question
             )
 
-            response = self.backend.complete(
-                prompt,
-                max_tokens=self.config.ai.max_tokens,
-                temperature=self.config.ai.temperature
-            )
+            if on_token or cancel_event:
+                def forward(text: str) -> Optional[bool]:
+                    if cancel_event and cancel_event.is_set():
+                        return False
+                    if on_token:
+                        on_token(text)
+                    return None
+
+                response = self.backend.stream_complete(
+                    prompt,
+                    max_tokens=self.config.ai.max_tokens,
+                    temperature=self.config.ai.temperature,
+                    on_token=forward
+                )
+                if cancel_event and cancel_event.is_set():
+                    return response or ""
+            else:
+                response = self.backend.complete(
+                    prompt,
+                    max_tokens=self.config.ai.max_tokens,
+                    temperature=self.config.ai.temperature
+                )
 
             if response:
                 return response
@@ -694,13 +1841,12 @@ class AIEngine:
 
     def summarize_file(self, file_content: str, file_info: str = "") -> str:
         """生成文件摘要"""
-        if not self.enabled or not self.model_loaded:
+        if not self._use_model():
             return self._simple_summary(file_content)
 
         try:
-            content = file_content[:3000]
-            prompt = self.summary_template.format(content=content)
-            response = self.backend.complete(prompt, max_tokens=200, temperature=0.2)
+            prompt = _render_template(self._summary_parts, content=self._summary_content(file_content))
+            response = self._complete_cached(prompt, _SUMMARY_MAX_TOKENS, _SUMMARY_TEMPERATURE)
 
             if response:
                 return response
@@ -709,15 +1855,50 @@ class AIEngine:
 
         return self._simple_summary(file_content)
 
+    def _complete_cached(self, prompt: str, max_tokens: int, temperature: float) -> Optional[str]:
+        """生成回复，低温度的结果走缓存"""
+        if temperature > _CACHE_MAX_TEMPERATURE:
+            return self.backend.complete(prompt, max_tokens=max_tokens, temperature=temperature)
+
+        key = (prompt, max_tokens, temperature)
+        response = self._get_cached_completion(key)
+        if response is None:
+            response = self.backend.complete(prompt, max_tokens=max_tokens, temperature=temperature)
+            if response:
+                self._cache_completion(key, response)
+        return response
+
+    def _get_cached_completion(self, key: Tuple[str, int, float]) -> Optional[str]:
+        with self._completion_cache_lock:
+            response = self._completion_cache.get(key)
+            if response is not None:
+                self._completion_cache.move_to_end(key)
+            return response
+
+    def _cache_completion(self, key: Tuple[str, int, float], response: str) -> None:
+        """缓存生成结果，超出容量时淘汰最久未使用的条目"""
+        with self._completion_cache_lock:
+            self._completion_cache[key] = response
+            self._completion_cache.move_to_end(key)
+            while len(self._completion_cache) > self._completion_cache_size:
+                self._completion_cache.popitem(last=False)
+
+    def _summary_content(self, file_content: str) -> str:
+        """截取用于摘要的内容，同时受字符数和上下文剩余 token 数限制"""
+        budget = self.config.ai.context_size - _SUMMARY_MAX_TOKENS - _SUMMARY_PROMPT_TOKENS
+        return self.backend.truncate_tokens(file_content[:_SUMMARY_MAX_CHARS], budget)
+
     def _simple_summary(self, file_content: str) -> str:
         """简单摘要（回退方法）"""
-        lines = file_content.split('\n')
-        summary = ' '.join(line.strip() for line in lines[:3] if line.strip())
+        # 只切出前 3 行，不拆分整个文件
+        lines = file_content.split('\n', 3)[:3]
+        summary = ' '.join(line.strip() for line in lines if line.strip())
         return summary[:200] + '...' if len(summary) > 200 else summary
 
     def is_enabled(self) -> bool:
         """检查 AI 功能是否启用"""
-        return self.enabled and (self.model_loaded or self.backend_type in ("simple", "ollama"))
+        return self.enabled and (self.model_loaded or self._load_future is not None
+                                 or self._backend_type in ("simple", "ollama"))
 
     def get_model_info(self) -> Dict[str, Any]:
         """获取模型信息"""
@@ -734,13 +1915,39 @@ class AIEngine:
 
         return info
 
+    def _get_probe(self, backend_id: str, backend_class) -> AIBackend:
+        """获取进程内共享的探测后端实例，首次使用时创建"""
+        with _backend_probes_lock:
+            probe = _backend_probes.get(backend_id)
+            if probe is None:
+                probe = backend_class(self.config)
+                _backend_probes[backend_id] = probe
+            return probe
+
+    def _probe_status(self, backend_id: str, backend_class) -> Dict[str, Any]:
+        """探测单个后端的状态"""
+        return self._get_probe(backend_id, backend_class).get_status()
+
     def get_available_backends(self) -> List[Dict[str, Any]]:
         """获取所有可用的AI后端列表"""
         backends_info = []
 
+        # 三个后端互不相关，并行探测，总耗时取决于最慢的一个
+        probe_classes = {
+            'ollama': OllamaBackend,
+            'llama-cpp-python': LlamaCppPythonBackend,
+            'llama.cpp-cli': LlamaCliBackend,
+        }
+        with ThreadPoolExecutor(max_workers=len(probe_classes),
+                                thread_name_prefix='ai_probe') as pool:
+            futures = {
+                backend_id: pool.submit(self._probe_status, backend_id, cls)
+                for backend_id, cls in probe_classes.items()
+            }
+            statuses = {backend_id: future.result() for backend_id, future in futures.items()}
+
         # 检查 Ollama
-        ollama = OllamaBackend(self.config)
-        ollama_status = ollama.get_status()
+        ollama_status = statuses['ollama']
         backends_info.append({
             'name': 'Ollama',
             'id': 'ollama',
@@ -753,24 +1960,24 @@ class AIEngine:
         })
 
         # 检查 llama-cpp-python
-        llama_cpp = LlamaCppPythonBackend(self.config)
+        llama_cpp_available = statuses['llama-cpp-python'].get('available', False)
         backends_info.append({
             'name': 'llama-cpp-python',
             'id': 'llama-cpp-python',
-            'available': llama_cpp.is_available(),
-            'installed': llama_cpp.is_available(),
+            'available': llama_cpp_available,
+            'installed': llama_cpp_available,
             'description': 'Python绑定，需要编译',
             'install_command': 'pip install llama-cpp-python',
             'website': 'https://github.com/abetlen/llama-cpp-python'
         })
 
         # 检查 llama.cpp CLI
-        llama_cli = LlamaCliBackend(self.config)
+        llama_cli_available = statuses['llama.cpp-cli'].get('available', False)
         backends_info.append({
             'name': 'llama.cpp CLI',
             'id': 'llama.cpp-cli',
-            'available': llama_cli.is_available(),
-            'installed': llama_cli.is_available(),
+            'available': llama_cli_available,
+            'installed': llama_cli_available,
             'description': '命令行工具',
             'install_command': '下载预编译版本',
             'website': 'https://github.com/ggerganov/llama.cpp'
@@ -789,28 +1996,70 @@ class AIEngine:
 
         return backends_info
 
-    def close(self) -> None:
-        """关闭 AI 引擎"""
+    def close(self, at_exit: bool = False) -> None:
+        """
+        关闭 AI 引擎
+
+        Args:
+            at_exit: 是否在解释器退出（atexit）时调用，此时直接在当前线程释放后端
+        """
+        with self._load_lock:
+            self._closed = True
+
+        with self._parse_cache_lock:
+            self._parse_cache.clear()
+        with self._completion_cache_lock:
+            self._completion_cache.clear()
         if self.executor:
-            self.executor.shutdown(wait=True)
-        if self.backend:
-            self.backend.close()
+            # 取消尚未开始的任务，不等待正在进行的加载
+            self.executor.shutdown(wait=False, cancel_futures=True)
         self.model_loaded = False
 
+        # 加载仍在进行时不等待，加载任务结束后检查关闭标志并自行释放后端
+        future = self._load_future
+        with self._load_lock:
+            loading = self._loading and not (future is not None and future.cancelled())
+        if loading:
+            return
+
+        if at_exit:
+            # 退出阶段不能再创建线程（Python 3.12+ 会抛出 RuntimeError）
+            self._release_backend()
+            return
+
+        # 释放后端（卸载模型、停止服务进程）可能较慢，放到守护线程中进行，最多等待 2 秒
+        closer = threading.Thread(target=self._release_backend, name='ai_engine_close', daemon=True)
+        closer.start()
+        closer.join(timeout=2)
+
+    def _release_backend(self) -> None:
+        """释放后端（卸载模型、停止服务进程）"""
+        backend = self.backend
+        if backend:
+            try:
+                backend.close()
+            except Exception as e:
+                self.logger.warning(f"释放 AI 后端失败: {e}")
+
 
 # 全局 AI 引擎实例
 _ai_engine_instance: Optional[AIEngine] = None
+_atexit_registered = False
 
 def get_ai_engine(config=None) -> AIEngine:
     """获取全局 AI 引擎"""
-    global _ai_engine_instance
+    global _ai_engine_instance, _atexit_registered
     if _ai_engine_instance is None:
         _ai_engine_instance = AIEngine(config)
+        if not _atexit_registered:
+            # 异常退出时也释放模型并停止 llama-server 进程
+            atexit.register(close_ai_engine, at_exit=True)
+            _atexit_registered = True
     return _ai_engine_instance
 
-def close_ai_engine() -> None:
+def close_ai_engine(at_exit: bool = False) -> None:
     """关闭全局 AI 引擎"""
     global _ai_engine_instance
     if _ai_engine_instance:
-        _ai_engine_instance.close()
+        _ai_engine_instance.close(at_exit=at_exit)
         _ai_engine_instance = None
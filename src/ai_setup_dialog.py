@@ -5,7 +5,6 @@ AI 设置向导对话框
 帮助用户轻松配置 AI 功能
 """
 
-import webbrowser
 from typing import Optional
 
 from PyQt6.QtWidgets import (
@@ -23,35 +22,29 @@ class OllamaInstallThread(QThread):
     """Ollama 安装检测线程"""
     finished = pyqtSignal(bool, str)  # success, message
 
+    # Ollama 服务默认监听地址
+    OLLAMA_ADDRESS = ('127.0.0.1', 11434)
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
     def run(self):
-        import subprocess
+        import socket
         import shutil
 
         try:
-            # 检查是否已安装
+            # 直接探测服务端口，服务已运行时无需再检查安装情况
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                sock.settimeout(0.2)
+                if sock.connect_ex(self.OLLAMA_ADDRESS) == 0:
+                    self.finished.emit(True, "Ollama 服务正在运行")
+                    return
+
             if shutil.which('ollama'):
-                self.finished.emit(True, "Ollama 已安装")
+                self.finished.emit(False, "Ollama 已安装，但服务未运行，请执行 ollama serve")
                 return
 
-            # 尝试自动安装（仅限支持的系统）
-            import platform
-            system = platform.system()
-
-            if system == "Darwin":  # macOS
-                # 检查是否有 brew
-                if shutil.which('brew'):
-                    result = subprocess.run(
-                        ['brew', 'install', 'ollama'],
-                        capture_output=True, text=True, timeout=300
-                    )
-                    if result.returncode == 0:
-                        self.finished.emit(True, "Ollama 安装成功！")
-                        return
-
-            # 需要手动安装
+            # 安装由用户手动完成（可通过“复制安装命令”获取命令）
             self.finished.emit(False, "请手动安装 Ollama")
 
         except Exception as e:
@@ -61,11 +54,16 @@ class OllamaInstallThread(QThread):
 class AISetupDialog(QDialog):
     """AI 设置向导对话框"""
 
+    # AI 引擎的后台后端探测完成（从探测线程发出，在界面线程处理）
+    backend_detected = pyqtSignal()
+
     def __init__(self, ai_engine, config, parent=None):
         super().__init__(parent)
         self.ai_engine = ai_engine
         self.config = config
         self.logger = logger.bind(module="ai_setup")
+        self._waiting_backend = False
+        self.backend_detected.connect(self._update_current_backend)
 
         self.setWindowTitle("AI 功能设置")
         self.setMinimumSize(600, 500)
@@ -257,9 +255,21 @@ class AISetupDialog(QDialog):
             self.backend_combo.addItem(f"{status}{backend['name']}")
             self._backend_data.append(backend)
 
-        # 更新状态
+        self._update_current_backend()
+
+    def _update_current_backend(self):
+        """按 AI 引擎当前使用的后端更新选择和状态标签"""
         current_backend = self.ai_engine.backend_type
-        for i, backend in enumerate(backends):
+        if current_backend == 'pending':
+            # 后台探测尚未完成，完成后通过信号再次更新
+            self.status_label.setText("当前后端: 正在检测...")
+            if not self._waiting_backend:
+                self._waiting_backend = True
+                self.ai_engine.on_backend_ready(self._notify_backend_detected)
+            self._on_backend_changed(self.backend_combo.currentIndex())
+            return
+
+        for i, backend in enumerate(self._backend_data):
             if backend['id'] == current_backend:
                 self.backend_combo.setCurrentIndex(i)
                 break
@@ -284,6 +294,15 @@ class AISetupDialog(QDialog):
 
         self._on_backend_changed(self.backend_combo.currentIndex())
 
+    def _notify_backend_detected(self, backend_type: str):
+        """AI 引擎的回调（在探测线程中调用），转为信号交给界面线程"""
+        self._waiting_backend = False
+        try:
+            self.backend_detected.emit()
+        except RuntimeError:
+            # 对话框已关闭并销毁
+            pass
+
     def _on_backend_changed(self, index):
         """后端选择改变"""
         if index < 0 or index >= len(self._backend_data):
@@ -346,6 +365,7 @@ CMAKE_ARGS="-DLLAMA_METAL=on" pip install llama-cpp-python
         if index >= 0 and index < len(self._backend_data):
             website = self._backend_data[index].get('website')
             if website:
+                import webbrowser
                 webbrowser.open(website)
 
     def _copy_install_command(self):
@@ -6,14 +6,47 @@
 """
 
 import os
+import re
+import copy
 import sys
 import yaml
+import fnmatch
 import logging
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, field, asdict
 from loguru import logger
 
+# 优先使用 libyaml 的 C 实现，解析和输出速度快一个数量级，行为与纯 Python 版本一致
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YamlDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+if _YamlLoader is yaml.SafeLoader:
+    logger.warning("PyYAML 未编译 libyaml 支持，配置文件使用较慢的纯 Python 解析器")
+
+# fnmatch.translate 生成的命名组（Python 3.10 中为 g1、g2 ...）
+_RE_FNMATCH_GROUP = re.compile(r'\(\?P([<=])')
+
+
+@lru_cache(maxsize=16)
+def _compile_patterns(patterns: Tuple[str, ...]) -> Optional["re.Pattern[str]"]:
+    """
+    把一组通配符模式合并成一个正则表达式，每个文件只需匹配一次
+    
+    每个模式放在命名组 p<序号> 中，以便从匹配结果找回对应的模式；模式列表为空时返回 None
+    """
+    if not patterns:
+        return None
+    
+    alternatives = []
+    for i, pattern in enumerate(patterns):
+        regex = fnmatch.translate(os.path.normcase(pattern))
+        # 给模式内部的命名组加上前缀，避免合并后重名
+        regex = _RE_FNMATCH_GROUP.sub(rf'(?P\g<1>p{i}_', regex)
+        alternatives.append(f'(?P<p{i}>{regex})')
+    return re.compile('|'.join(alternatives))
+
+
 # 默认配置
 DEFAULT_CONFIG = {
     "logging": {
@@ -62,16 +95,18 @@ DEFAULT_CONFIG = {
         "context_size": 2048,
         "max_tokens": 512,
         "temperature": 0.1,
+        "n_threads": 0,  # 0 表示按物理核心数自动选择
+        "n_batch": 1024,
+        "n_ubatch": 512,
+        "auto_quantize": False,  # 未量化的模型首次加载时自动量化为 Q4_K_M（需手动开启）
+        "kv_cache_type": "f16",  # KV 缓存量化类型，f16 表示不量化
         "prompt_template": """你是一个文件搜索助手，请根据以下文件内容回答问题。
+请基于文件内容提供准确的回答。如果文件内容中没有相关信息，请如实说明。
 
 文件列表：
 {file_context}
 
-用户问题：{question}
-
-请基于文件内容提供准确的回答。如果文件内容中没有相关信息，请如实说明。
-
-回答：""",
+用户问题：{question}""",
     },
     "gui": {
         "theme": "dark",
@@ -134,6 +169,16 @@ class IndexConfig:
     index_dir: str = "data/indexdir"
     update_interval: int = 300
     incremental: bool = True
+    
+    def match_exclude_pattern(self, path: str) -> Optional[str]:
+        """返回文件名或完整路径匹配到的排除模式，都不匹配时返回 None"""
+        regex = _compile_patterns(tuple(self.exclude_patterns))
+        if regex is None:
+            return None
+        
+        path = os.path.normcase(path)
+        match = regex.match(os.path.basename(path)) or regex.match(path)
+        return self.exclude_patterns[int(match.lastgroup[1:])] if match else None
 
 
 @dataclass
@@ -145,6 +190,11 @@ class AIConfig:
     context_size: int = 2048
     max_tokens: int = 512
     temperature: float = 0.1
+    n_threads: int = 0  # 推理线程数，0 表示自动
+    n_batch: int = 1024  # 提示词处理批大小
+    n_ubatch: int = 512  # 物理批大小
+    auto_quantize: bool = False  # 自动量化 F16/F32 模型
+    kv_cache_type: str = "f16"  # KV 缓存类型：f16 / q8_0 / q4_0
     prompt_template: str = ""
 
 
@@ -212,6 +262,9 @@ class AppConfig:
 class ConfigManager:
     """配置管理器"""
     
+    # 已解析的配置：路径 -> ((修改时间, 大小), 合并后的配置字典)，文件未变化时跳过 YAML 解析
+    _load_cache: Dict[str, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+    
     def __init__(self, config_path: Optional[str] = None):
         """
         初始化配置管理器
@@ -243,10 +296,13 @@ class ConfigManager:
         """展开路径中的 ~ 和变量"""
         return os.path.expanduser(os.path.expandvars(path))
     
-    def load(self) -> AppConfig:
+    def load(self, use_cache: bool = True) -> AppConfig:
         """
         加载配置文件
         
+        Args:
+            use_cache: 文件未修改时是否复用上次解析的结果（每次仍返回新的配置对象）
+        
         Returns:
             AppConfig: 配置对象
         """
@@ -257,9 +313,23 @@ class ConfigManager:
             self.logger.warning(f"配置文件不存在: {config_path}，创建默认配置")
             self.create_default_config()
         
+        # 文件未修改时跳过 YAML 解析，用上次合并好的字典构建新的配置对象；
+        # 调用方会修改拿到的配置对象，因此不能直接返回缓存的对象
+        cache_key = str(config_path)
+        try:
+            stat = config_path.stat()
+            file_state = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_state = None
+        
+        cached = ConfigManager._load_cache.get(cache_key) if use_cache else None
+        if file_state is not None and cached is not None and cached[0] == file_state:
+            self.config = self.dict_to_dataclass(copy.deepcopy(cached[1]))
+            return self.config
+        
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                yaml_config = yaml.safe_load(f) or {}
+                yaml_config = yaml.load(f, Loader=_YamlLoader) or {}
         except Exception as e:
             self.logger.error(f"读取配置文件失败: {e}")
             yaml_config = {}
@@ -267,6 +337,9 @@ class ConfigManager:
         # 合并默认配置
         merged_config = self.merge_configs(DEFAULT_CONFIG, yaml_config)
         
+        if file_state is not None:
+            ConfigManager._load_cache[cache_key] = (file_state, copy.deepcopy(merged_config))
+        
         # 转换为数据类
         self.config = self.dict_to_dataclass(merged_config)
         
@@ -322,7 +395,7 @@ class ConfigManager:
         
         try:
             with open(config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(DEFAULT_CONFIG, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(DEFAULT_CONFIG, f, Dumper=_YamlDumper, default_flow_style=False, allow_unicode=True, indent=2)
             self.logger.info(f"创建默认配置文件: {config_path}")
         except Exception as e:
             self.logger.error(f"创建默认配置文件失败: {e}")
@@ -360,20 +433,12 @@ class ConfigManager:
             return
         
         # 将数据类转换为字典
-        config_dict = {
-            "logging": config.logging.__dict__,
-            "index": config.index.__dict__,
-            "ai": config.ai.__dict__,
-            "gui": config.gui.__dict__,
-            "search": config.search.__dict__,
-            "advanced": config.advanced.__dict__,
-            "language": config.language,
-            "update_check": config.update_check.__dict__,
-        }
+        config_dict = asdict(config)
         
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config_dict, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(config_dict, f, Dumper=_YamlDumper, default_flow_style=False, allow_unicode=True, indent=2)
+            ConfigManager._load_cache.pop(str(Path(self.config_path)), None)
             self.logger.info(f"配置已保存: {self.config_path}")
         except Exception as e:
             self.logger.error(f"保存配置失败: {e}")
@@ -397,10 +462,10 @@ def get_config(config_path: Optional[str] = None) -> AppConfig:
 
 
 def reload_config(config_path: Optional[str] = None) -> AppConfig:
-    """重新加载配置"""
+    """重新加载配置（总是重新读取文件，丢弃未保存的修改）"""
     global _config_manager
     _config_manager = ConfigManager(config_path)
-    return _config_manager.load()
+    return _config_manager.load(use_cache=False)
 
 
 if __name__ == "__main__":
@@ -7,33 +7,84 @@
 
 import os
 import re
-import chardet
+import codecs
+import mmap
+import multiprocessing
 import logging
+import threading
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import OrderedDict, deque
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple, List, Iterator
 from abc import ABC, abstractmethod
 from loguru import logger
 
-# 尝试导入可选依赖
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
-    logger.warning("python-docx 未安装，Word 文档支持已禁用")
+# 编码检测函数，首次需要检测编码时才导入（大多数文件按 UTF-8 解码即可，不需要检测）
+_detect_encoding = None
 
-try:
-    import openpyxl
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
-    logger.warning("openpyxl 未安装，Excel 文件支持已禁用")
+# 文本清理：制表符转空格的转换表，以及合并连续空格的正则表达式
+_TAB_TO_SPACE = str.maketrans('\t', ' ')
+_RE_MULTISPACE = re.compile(r' {2,}')
 
-try:
-    import pandas as pd
-    PANDAS_AVAILABLE = True
-except ImportError:
-    PANDAS_AVAILABLE = False
+# Office Open XML 中用到的元素名（docx/xlsx 本质是 zip 包中的 XML 文件）
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_W_P = _W_NS + 'p'
+_W_R = _W_NS + 'r'
+_W_T = _W_NS + 't'
+_W_TAB = _W_NS + 'tab'
+_W_BR = _W_NS + 'br'
+_W_CR = _W_NS + 'cr'
+_W_TBL = _W_NS + 'tbl'
+_W_TR = _W_NS + 'tr'
+_W_TC = _W_NS + 'tc'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+_X_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_X_SHEET = _X_NS + 'sheet'
+_X_ROW = _X_NS + 'row'
+_X_C = _X_NS + 'c'
+_X_V = _X_NS + 'v'
+_X_IS = _X_NS + 'is'
+_X_SI = _X_NS + 'si'
+_X_R = _X_NS + 'r'
+_X_T = _X_NS + 't'
+_X_WORKBOOK_PR = _X_NS + 'workbookPr'
+_X_NUM_FMT = _X_NS + 'numFmt'
+_X_CELL_XFS = _X_NS + 'cellXfs'
+_X_XF = _X_NS + 'xf'
+_R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+# xlsx 日期单元格以序列号存储，按单元格样式的数字格式判断是否为日期（与 openpyxl 的规则相同）
+# 内置日期/时间格式编号（含中日韩、泰语区域的内置格式），46 为 [h]:mm:ss 时长格式
+_XLSX_BUILTIN_DATE_FORMATS = frozenset(
+    [*range(14, 23), *range(27, 37), 45, 46, 47, *range(50, 59), *range(71, 82)]
+)
+_XLSX_BUILTIN_TIMEDELTA_FORMATS = frozenset([46])
+# 判断自定义格式前先去掉引号文本、转义字符、填充/对齐符号以及除 [h]/[m]/[s] 以外的方括号内容
+_RE_XLSX_FORMAT_STRIP = re.compile(r'"[^"]*"|\\.|_.|\*.|\[(?![hms]+\])[^\]]*\]', re.IGNORECASE)
+_RE_XLSX_DATE_FORMAT = re.compile(r'[dmyhs]', re.IGNORECASE)
+_RE_XLSX_TIMEDELTA_FORMAT = re.compile(r'\[[hms]+\]', re.IGNORECASE)
+# 日期序列号的起点：1900 日期系统（含 Excel 的 1900 闰年错误）和 1904 日期系统
+_XLSX_EPOCH_1900 = datetime(1899, 12, 30)
+_XLSX_EPOCH_1904 = datetime(1904, 1, 1)
+
+
+def _get_encoding_detector():
+    """获取编码检测函数：优先使用更快的 charset_normalizer（接口与 chardet.detect 兼容）"""
+    global _detect_encoding
+    if _detect_encoding is None:
+        try:
+            from charset_normalizer import detect
+        except ImportError:
+            from chardet import detect
+        _detect_encoding = detect
+    return _detect_encoding
 
 
 class FileParserBase(ABC):
@@ -72,6 +123,12 @@ class FileParserBase(ABC):
 class TextFileParser(FileParserBase):
     """纯文本文件解析器"""
     
+    # 编码检测使用的样本大小（字节）
+    DETECT_SAMPLE_SIZE = 64 * 1024
+    
+    # 分块读取的大小（字节）
+    READ_CHUNK_SIZE = 1024 * 1024
+    
     def __init__(self):
         super().__init__()
         self.supported_extensions = {'.txt', '.md', '.py', '.java', '.cpp', '.h', 
@@ -81,75 +138,89 @@ class TextFileParser(FileParserBase):
     
     def parse(self, file_path: str) -> Optional[str]:
         try:
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-            
-            # 检测编码
-            result = chardet.detect(raw_data)
-            encoding = result['encoding'] or 'utf-8'
-            confidence = result['confidence']
-            
-            if confidence < 0.7:
-                self.logger.warning(f"编码检测置信度低 ({confidence:.2f})，文件: {file_path}")
-            
-            # 尝试解码
-            try:
-                content = raw_data.decode(encoding)
-            except UnicodeDecodeError:
-                # 尝试常见编码
-                for enc in ['utf-8', 'gbk', 'gb2312', 'latin-1']:
+            # 映射整个文件，由内核按需读入页面；解码时直接切片内存视图，不复制文件内容
+            with open(file_path, 'rb') as f, self._map_file(f) as data, memoryview(data) as view:
+                sample = bytes(view[:self.DETECT_SAMPLE_SIZE])
+                
+                # 按候选编码依次尝试，分块解码并清理，不需要把整个文件解码成一个大字符串
+                for encoding in self._candidate_encodings(sample, file_path):
                     try:
-                        content = raw_data.decode(enc)
-                        encoding = enc
-                        break
-                    except UnicodeDecodeError:
+                        return self._decode_cleaned(view, encoding)
+                    except (UnicodeDecodeError, LookupError):
                         continue
-                else:
-                    self.logger.error(f"无法解码文件: {file_path}")
-                    return None
-            
-            # 清理文本：移除过多的空白字符
-            content = re.sub(r'\r\n', '\n', content)  # 统一换行符
-            content = re.sub(r'\t', ' ', content)     # 制表符转空格
-            content = re.sub(r'[ \t]{2,}', ' ', content)  # 多个空格合并
             
-            return content
+            self.logger.error(f"无法解码文件: {file_path}")
+            return None
             
         except Exception as e:
             self.logger.error(f"解析文本文件失败 {file_path}: {e}")
             return None
     
+    def _candidate_encodings(self, sample: bytes, file_path: str):
+        """依次给出候选编码：绝大多数文件是 UTF-8，先直接尝试，失败后才检测编码"""
+        # UTF-8（含 BOM）解码成功即可确定编码，无需检测
+        yield 'utf-8-sig'
+        
+        # 检测编码（只取文件开头的样本，检测结果与全文基本一致）
+        result = _get_encoding_detector()(sample)
+        encoding = result['encoding'] or 'utf-8'
+        confidence = result['confidence'] or 0.0
+        
+        if confidence < 0.7:
+            self.logger.warning(f"编码检测置信度低 ({confidence:.2f})，文件: {file_path}")
+        
+        yield encoding
+        
+        # 尝试常见编码
+        yield from ['gbk', 'gb18030', 'latin-1']
+    
+    @staticmethod
+    def _map_file(f):
+        """只读映射文件；空文件或不支持映射的文件（如管道）退回为普通读取"""
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return nullcontext(f.read())
+    
+    def _decode_cleaned(self, view: memoryview, encoding: str) -> str:
+        """分块增量解码，逐块清理空白字符"""
+        decoder = codecs.getincrementaldecoder(encoding)()
+        parts = []
+        carry = ''
+        for start in range(0, len(view), self.READ_CHUNK_SIZE):
+            text = carry + decoder.decode(view[start:start + self.READ_CHUNK_SIZE])
+            
+            # 块末尾的 '\r' 和空白可能与下一块组成 '\r\n' 或连续空格，留到下一块一起处理
+            stripped = text.rstrip(' \t\r')
+            carry = text[len(stripped):]
+            parts.append(self._clean(stripped))
+        
+        parts.append(self._clean(carry + decoder.decode(b'', final=True)))
+        return ''.join(parts)
+    
+    @staticmethod
+    def _clean(text: str) -> str:
+        """清理文本：移除过多的空白字符"""
+        # 统一换行符、制表符转空格（均为单次扫描的字符串操作），再合并多个空格
+        text = text.replace('\r\n', '\n').translate(_TAB_TO_SPACE)
+        return _RE_MULTISPACE.sub(' ', text)
+    
     def supports(self, file_path: str) -> bool:
         ext = Path(file_path).suffix.lower()
         return ext in self.supported_extensions
 
 
 class WordDocumentParser(FileParserBase):
-    """Word 文档解析器"""
+    """Word 文档解析器（直接流式读取 word/document.xml，只提取文本）"""
     
     def __init__(self):
         super().__init__()
         self.supported_extensions = {'.docx'}
     
     def parse(self, file_path: str) -> Optional[str]:
-        if not DOCX_AVAILABLE:
-            self.logger.error(f"无法解析 Word 文档，python-docx 未安装: {file_path}")
-            return None
-        
         try:
-            doc = Document(file_path)
-            paragraphs = [para.text for para in doc.paragraphs if para.text.strip()]
-            
-            # 提取表格内容
-            tables_text = []
-            for table in doc.tables:
-                for row in table.rows:
-                    row_text = []
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            row_text.append(cell.text.strip())
-                    if row_text:
-                        tables_text.append(' | '.join(row_text))
+            with zipfile.ZipFile(file_path) as z, z.open('word/document.xml') as f:
+                paragraphs, tables_text = self._extract_text(f)
             
             content = '\n'.join(paragraphs)
             if tables_text:
@@ -161,55 +232,106 @@ class WordDocumentParser(FileParserBase):
             self.logger.error(f"解析 Word 文档失败 {file_path}: {e}")
             return None
     
+    @staticmethod
+    def _extract_text(f) -> Tuple[List[str], List[str]]:
+        """流式解析文档 XML，返回正文段落和表格行（单元格以 ' | ' 连接）
+        
+        文本框里的段落嵌套在外层段落的文本块中，单独成段，不打断外层段落；
+        mc:Fallback 是 mc:Choice 的兼容副本，跳过以免文本重复。
+        """
+        paragraphs = []
+        tables_text = []
+        runs_stack = []   # 每个未结束段落的文本片段（文本框段落嵌套在外层段落中）
+        cell_paras = []   # 当前单元格的段落
+        row_text = []     # 当前表格行的单元格文本
+        table_depth = 0
+        run_depth = 0
+        fallback_depth = 0
+        
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            tag = elem.tag
+            if tag == _MC_FALLBACK:
+                fallback_depth += 1 if event == 'start' else -1
+                if event == 'end':
+                    elem.clear()
+                continue
+            if fallback_depth:
+                continue
+            
+            if event == 'start':
+                if tag == _W_P:
+                    runs_stack.append([])
+                elif tag == _W_TBL:
+                    table_depth += 1
+                elif tag == _W_R:
+                    run_depth += 1
+                continue
+            
+            runs = runs_stack[-1] if runs_stack else None
+            if tag == _W_T:
+                if elem.text and runs is not None:
+                    runs.append(elem.text)
+            elif tag == _W_R:
+                run_depth -= 1
+            elif run_depth and runs is not None and tag == _W_TAB:
+                # 段落属性里的制表位也叫 w:tab，只处理文本块内的
+                runs.append('\t')
+            elif run_depth and runs is not None and (tag == _W_BR or tag == _W_CR):
+                runs.append('\n')
+            elif tag == _W_P:
+                text = ''.join(runs_stack.pop())
+                if table_depth:
+                    cell_paras.append(text)
+                elif text.strip():
+                    paragraphs.append(text)
+                elem.clear()
+            elif tag == _W_TC and table_depth == 1:
+                # 嵌套表格的文本并入外层单元格
+                cell_text = '\n'.join(cell_paras).strip()
+                cell_paras.clear()
+                if cell_text:
+                    row_text.append(cell_text)
+            elif tag == _W_TR and table_depth == 1:
+                if row_text:
+                    tables_text.append(' | '.join(row_text))
+                    row_text = []
+            elif tag == _W_TBL:
+                table_depth -= 1
+                elem.clear()
+        
+        return paragraphs, tables_text
+    
     def supports(self, file_path: str) -> bool:
         ext = Path(file_path).suffix.lower()
-        return ext in self.supported_extensions and DOCX_AVAILABLE
+        return ext in self.supported_extensions
 
 
 class ExcelFileParser(FileParserBase):
-    """Excel 文件解析器"""
+    """Excel 文件解析器（直接流式读取工作表 XML，只提取单元格值）"""
+    
+    # 每个工作表最多读取的行数和列数
+    MAX_ROWS = 1000
+    MAX_COLUMNS = 50
     
     def __init__(self):
         super().__init__()
         self.supported_extensions = {'.xlsx', '.xls'}
     
     def parse(self, file_path: str) -> Optional[str]:
-        if not OPENPYXL_AVAILABLE:
-            self.logger.error(f"无法解析 Excel 文件，openpyxl 未安装: {file_path}")
-            return None
-        
         try:
-            wb = openpyxl.load_workbook(file_path, data_only=True, read_only=True)
             content_parts = []
             
-            for sheet_name in wb.sheetnames:
-                ws = wb[sheet_name]
-                sheet_content = []
-                
-                # 获取有数据的范围
-                if ws.max_row > 0 and ws.max_column > 0:
-                    for row in ws.iter_rows(min_row=1, max_row=min(ws.max_row, 1000), 
-                                          min_col=1, max_col=min(ws.max_column, 50),
-                                          values_only=True):
-                        # 过滤空行
-                        row_values = []
-                        for cell in row:
-                            if cell is not None:
-                                # 处理不同数据类型
-                                if isinstance(cell, str):
-                                    row_values.append(cell.strip())
-                                else:
-                                    row_values.append(str(cell))
-                        
-                        if row_values:
-                            sheet_content.append(' | '.join(row_values))
+            with zipfile.ZipFile(file_path) as z:
+                shared_strings = self._read_shared_strings(z)
+                date_styles = self._read_date_styles(z)
+                epoch = self._date_epoch(z)
                 
-                if sheet_content:
-                    content_parts.append(f"工作表: {sheet_name}")
-                    content_parts.extend(sheet_content)
-                    content_parts.append('')  # 空行分隔
-            
-            wb.close()
+                for sheet_name, sheet_path in self._sheet_paths(z):
+                    sheet_content = self._read_sheet(z, sheet_path, shared_strings, date_styles, epoch)
+                    if sheet_content:
+                        content_parts.append(f"工作表: {sheet_name}")
+                        content_parts.extend(sheet_content)
+                        content_parts.append('')  # 空行分隔
             
             content = '\n'.join(content_parts)
             return content if content.strip() else None
@@ -218,28 +340,242 @@ class ExcelFileParser(FileParserBase):
             self.logger.error(f"解析 Excel 文件失败 {file_path}: {e}")
             return None
     
+    @staticmethod
+    def _read_shared_strings(z: zipfile.ZipFile) -> List[str]:
+        """读取共享字符串表（单元格中的文本大多以索引引用这里）"""
+        try:
+            f = z.open('xl/sharedStrings.xml')
+        except KeyError:
+            return []
+        
+        strings = []
+        with f:
+            for _, elem in ET.iterparse(f):
+                if elem.tag == _X_SI:
+                    strings.append(_xlsx_rich_text(elem))
+                    elem.clear()
+        return strings
+    
+    @staticmethod
+    def _read_date_styles(z: zipfile.ZipFile) -> List[Optional[str]]:
+        """
+        读取单元格样式表，返回按样式编号（单元格的 s 属性）索引的列表：
+        'date' 表示日期/时间格式，'timedelta' 表示 [h]:mm 等时长格式，None 表示普通数字
+        """
+        try:
+            styles = ET.fromstring(z.read('xl/styles.xml'))
+        except KeyError:
+            return []
+        
+        custom_formats = {}
+        for num_fmt in styles.iter(_X_NUM_FMT):
+            try:
+                custom_formats[int(num_fmt.get('numFmtId'))] = num_fmt.get('formatCode', '')
+            except (TypeError, ValueError):
+                continue
+        
+        cell_xfs = styles.find(_X_CELL_XFS)
+        if cell_xfs is None:
+            return []
+        
+        kinds = []
+        for xf in cell_xfs.iter(_X_XF):
+            try:
+                kinds.append(_xlsx_format_kind(int(xf.get('numFmtId', 0)), custom_formats))
+            except ValueError:
+                kinds.append(None)
+        return kinds
+    
+    @staticmethod
+    def _date_epoch(z: zipfile.ZipFile) -> datetime:
+        """工作簿使用的日期系统（workbookPr 的 date1904 属性）"""
+        workbook = ET.fromstring(z.read('xl/workbook.xml'))
+        workbook_pr = workbook.find(_X_WORKBOOK_PR)
+        if workbook_pr is not None and workbook_pr.get('date1904') in ('1', 'true'):
+            return _XLSX_EPOCH_1904
+        return _XLSX_EPOCH_1900
+    
+    @staticmethod
+    def _sheet_paths(z: zipfile.ZipFile) -> List[Tuple[str, str]]:
+        """按工作簿中的顺序返回 (工作表名, 工作表 XML 路径)"""
+        rels = ET.fromstring(z.read('xl/_rels/workbook.xml.rels'))
+        targets = {rel.get('Id'): rel.get('Target', '') for rel in rels.iter(_PKG_REL)}
+        names = set(z.namelist())
+        
+        sheets = []
+        workbook = ET.fromstring(z.read('xl/workbook.xml'))
+        for sheet in workbook.iter(_X_SHEET):
+            target = targets.get(sheet.get(_R_ID), '')
+            if target.startswith('/'):
+                path = target.lstrip('/')
+            else:
+                path = posixpath.normpath(posixpath.join('xl', target))
+            if path in names:
+                sheets.append((sheet.get('name', ''), path))
+        return sheets
+    
+    def _read_sheet(self, z: zipfile.ZipFile, sheet_path: str, shared_strings: List[str],
+                    date_styles: List[Optional[str]], epoch: datetime) -> List[str]:
+        """流式读取一个工作表，每行的非空单元格以 ' | ' 连接"""
+        sheet_content = []
+        row_values = []
+        row_index = 0
+        column_index = 0
+        
+        with z.open(sheet_path) as f:
+            for _, elem in ET.iterparse(f):
+                tag = elem.tag
+                if tag == _X_C:
+                    ref = elem.get('r')
+                    column_index = _xlsx_column_index(ref) if ref else column_index + 1
+                    if column_index <= self.MAX_COLUMNS:
+                        value = _xlsx_cell_text(elem, shared_strings, date_styles, epoch)
+                        if value is not None:
+                            row_values.append(value)
+                elif tag == _X_ROW:
+                    ref = elem.get('r')
+                    row_index = int(ref) if ref else row_index + 1
+                    column_index = 0
+                    if row_index > self.MAX_ROWS:
+                        # 行按顺序存储，后面的内容不再需要
+                        break
+                    if row_values:
+                        sheet_content.append(' | '.join(row_values))
+                        row_values = []
+                    elem.clear()
+        
+        return sheet_content
+    
     def supports(self, file_path: str) -> bool:
         ext = Path(file_path).suffix.lower()
-        return ext in self.supported_extensions and OPENPYXL_AVAILABLE
+        return ext in self.supported_extensions
+
+
+def _xlsx_rich_text(elem) -> str:
+    """拼接 <si>/<is> 中的文本（直接的 <t> 与富文本 <r><t>，不含注音 <rPh>）"""
+    parts = []
+    for child in elem:
+        if child.tag == _X_T:
+            parts.append(child.text or '')
+        elif child.tag == _X_R:
+            t = child.find(_X_T)
+            if t is not None:
+                parts.append(t.text or '')
+    return ''.join(parts)
+
+
+def _xlsx_column_index(ref: str) -> int:
+    """单元格引用（如 'AB12'）转为从 1 开始的列号"""
+    index = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index
+
+
+def _xlsx_format_kind(num_fmt_id: int, custom_formats: Dict[int, str]) -> Optional[str]:
+    """数字格式的类型：'date'、'timedelta' 或 None（普通数字）"""
+    format_code = custom_formats.get(num_fmt_id)
+    if format_code is None:
+        if num_fmt_id in _XLSX_BUILTIN_TIMEDELTA_FORMATS:
+            return 'timedelta'
+        return 'date' if num_fmt_id in _XLSX_BUILTIN_DATE_FORMATS else None
+    
+    # 只看正数部分的格式
+    format_code = format_code.split(';', 1)[0]
+    if _RE_XLSX_TIMEDELTA_FORMAT.search(format_code):
+        return 'timedelta'
+    if _RE_XLSX_DATE_FORMAT.search(_RE_XLSX_FORMAT_STRIP.sub('', format_code)):
+        return 'date'
+    return None
+
+
+def _xlsx_date_text(serial: float, kind: str, epoch: datetime) -> str:
+    """日期序列号转为文本，与 openpyxl 读出的 datetime/time/timedelta 的 str() 结果一致"""
+    if kind == 'timedelta':
+        return str(timedelta(milliseconds=round(serial * 86400000)))
+    
+    day, fraction = divmod(serial, 1)
+    time_part = timedelta(milliseconds=round(fraction * 86400000))
+    if 0 <= serial < 1 and time_part.days == 0:
+        # 只有时间部分
+        return str((datetime.min + time_part).time())
+    if 0 < serial < 60 and epoch == _XLSX_EPOCH_1900:
+        # Excel 把 1900 年当作闰年，3 月 1 日之前的序列号多算了一天
+        day += 1
+    return str(epoch + timedelta(days=day) + time_part)
+
+
+def _xlsx_cell_text(elem, shared_strings: List[str], date_styles: List[Optional[str]] = (),
+                    epoch: datetime = _XLSX_EPOCH_1900) -> Optional[str]:
+    """取单元格的显示文本（公式单元格使用缓存的计算结果，日期格式转为日期），空单元格返回 None"""
+    cell_type = elem.get('t')
+    if cell_type == 'inlineStr':
+        inline = elem.find(_X_IS)
+        return _xlsx_rich_text(inline).strip() if inline is not None else None
+    
+    v = elem.find(_X_V)
+    if v is None or v.text is None:
+        return None
+    
+    value = v.text
+    if cell_type == 's':
+        return shared_strings[int(value)].strip()
+    if cell_type == 'b':
+        return 'True' if value == '1' else 'False'
+    if cell_type in ('str', 'e'):
+        return value.strip()
+    
+    # 日期格式的数值单元格转为日期文本
+    style = elem.get('s')
+    if style and date_styles:
+        style_index = int(style)
+        kind = date_styles[style_index] if style_index < len(date_styles) else None
+        if kind is not None:
+            try:
+                return _xlsx_date_text(float(value), kind, epoch)
+            except (ValueError, OverflowError):
+                pass
+    
+    # 数值：与 openpyxl 相同，含小数点或指数的按浮点数处理，否则按整数处理
+    try:
+        if '.' in value or 'E' in value or 'e' in value:
+            return str(float(value))
+        return str(int(value))
+    except ValueError:
+        return value.strip()
 
 
 class FileParser:
     """统一文件解析器，根据文件类型分发给具体解析器"""
     
-    def __init__(self):
+    # 超过此大小的文件不解析（100MB）
+    MAX_FILE_SIZE = 100 * 1024 * 1024
+    
+    def __init__(self, cache_size_mb: int = 100):
         self.logger = logger.bind(module="file_parser")
         self.parsers = []
+        self._ext_map: Dict[str, FileParserBase] = {}
         self._register_parsers()
+        
+        # 解析结果缓存（(路径, 修改时间, 大小) -> 内容），文件未变化时直接返回
+        self._cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_chars = 0
+        self._cache_max_chars = cache_size_mb * 1024 * 1024
     
     def _register_parsers(self):
         """注册所有可用的解析器"""
         self.parsers.append(TextFileParser())
         
-        if DOCX_AVAILABLE:
-            self.parsers.append(WordDocumentParser())
+        self.parsers.append(WordDocumentParser())
+        self.parsers.append(ExcelFileParser())
         
-        if OPENPYXL_AVAILABLE:
-            self.parsers.append(ExcelFileParser())
+        # 扩展名 -> 解析器映射，按注册顺序先注册者优先（与逐个 supports() 的结果一致）
+        for parser in self.parsers:
+            for ext in parser.supported_extensions:
+                self._ext_map.setdefault(ext, parser)
         
         self.logger.info(f"已注册 {len(self.parsers)} 个文件解析器")
     
@@ -253,34 +589,54 @@ class FileParser:
         Returns:
             解析器实例，如果不支持则返回 None
         """
-        for parser in self.parsers:
-            if parser.supports(file_path):
-                return parser
-        return None
+        # 直接从最后一个 '.' 切出扩展名，比 os.path.splitext 少一次函数调用和元组分配；
+        # 目录名中的 '.' 切出的片段含路径分隔符，不会命中映射
+        dot = file_path.rfind('.')
+        return self._ext_map.get(file_path[dot:].lower()) if dot >= 0 else None
     
-    def parse(self, file_path: str) -> Optional[str]:
+    def parse(self, file_path: str, include_meta: bool = False) -> Optional[str]:
         """
         解析文件
         
         Args:
             file_path: 文件路径
+            include_meta: 是否在内容前加上文件名、路径和大小的元信息头
             
         Returns:
             文件内容文本，如果解析失败则返回 None
         """
-        file_path = str(Path(file_path).resolve())
+        file_path = os.fspath(file_path)
         
-        # 检查文件是否存在
-        if not Path(file_path).exists():
+        # 检查文件是否存在（一次 stat 同时得到大小和修改时间）
+        try:
+            stat = os.stat(file_path)
+        except OSError:
             self.logger.error(f"文件不存在: {file_path}")
             return None
         
         # 检查文件大小
-        file_size = Path(file_path).stat().st_size
-        if file_size > 100 * 1024 * 1024:  # 100MB
+        file_size = stat.st_size
+        if file_size > self.MAX_FILE_SIZE:
             self.logger.warning(f"文件过大 ({file_size/1024/1024:.1f}MB)，跳过: {file_path}")
             return None
         
+        # 文件未变化时直接使用缓存的解析结果
+        cache_key = (file_path, stat.st_mtime_ns, file_size)
+        content = self._get_cached(cache_key)
+        if content is None:
+            content = self._parse_content(file_path)
+            if content is None:
+                return None
+            self._cache_content(cache_key, content)
+        
+        if include_meta:
+            # 添加文件元信息（只在需要时才解析绝对路径）
+            meta = f"文件: {os.path.basename(file_path)}\n路径: {os.path.abspath(file_path)}\n大小: {file_size} 字节\n"
+            content = meta + "=" * 50 + "\n" + content
+        return content
+    
+    def _parse_content(self, file_path: str) -> Optional[str]:
+        """使用对应的解析器提取文件内容，不支持、为空或失败时返回 None"""
         # 获取合适的解析器
         parser = self.get_parser(file_path)
         if parser is None:
@@ -292,9 +648,6 @@ class FileParser:
             content = parser.parse(file_path)
             
             if content and len(content.strip()) > 0:
-                # 添加文件元信息
-                meta = f"文件: {Path(file_path).name}\n路径: {file_path}\n大小: {file_size} 字节\n"
-                content = meta + "=" * 50 + "\n" + content
                 return content
             else:
                 self.logger.warning(f"文件内容为空: {file_path}")
@@ -304,13 +657,97 @@ class FileParser:
             self.logger.error(f"解析文件失败 {file_path}: {e}")
             return None
     
+    # 需要解析的文件数少于此值时直接在当前进程解析，启动进程池的开销比并行节省的时间更多
+    PARALLEL_MIN_FILES = 32
+    
+    # 每个子进程最多同时排队的文件数，已解析但尚未被取走的内容不会随文件总数增长
+    PARALLEL_WINDOW_PER_WORKER = 4
+    
+    def parse_many(self, paths: List[str], max_workers: Optional[int] = None) -> Iterator[Tuple[str, Optional[str]]]:
+        """
+        使用进程池并行解析多个文件（解码、正则清理、docx/xlsx 解析都是 CPU 密集型，线程受 GIL 限制）
+        
+        已缓存的文件直接从缓存读取，只有未缓存的文件才交给子进程，解析结果写回当前进程的缓存；
+        任务按窗口分批提交，提前关闭返回的生成器（例如取消索引）时，尚未开始的解析任务会被取消
+        
+        Args:
+            paths: 文件路径列表
+            max_workers: 进程数，默认与 CPU 核数相同（一般传入 advanced.parser_threads）
+            
+        Returns:
+            按输入顺序逐个产出的 (文件路径, 文件内容) 元组，内容为 None 表示解析失败
+        """
+        # 先在当前进程确定每个文件的缓存键（只需 stat），None 表示直接在当前进程处理
+        # （已缓存、不存在或过大的文件，parse 会立即返回）
+        cache_keys = [self._parse_cache_key(path) for path in paths]
+        if sum(key is not None for key in cache_keys) < self.PARALLEL_MIN_FILES:
+            for path in paths:
+                yield path, self.parse(path)
+            return
+        
+        workers = max_workers or os.cpu_count() or 1
+        window_size = workers * self.PARALLEL_WINDOW_PER_WORKER
+        # 界面和索引线程都在运行，fork 出的子进程可能继承被其他线程持有的锁，因此使用 spawn
+        executor = ProcessPoolExecutor(max_workers=workers,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        window = deque()  # (文件路径, 缓存键, 解析任务)，缓存键为 None 时任务为空
+        try:
+            for path, cache_key in zip(paths, cache_keys):
+                future = executor.submit(_parse_in_worker, path) if cache_key is not None else None
+                window.append((path, cache_key, future))
+                # 窗口已满时先按顺序取走最早的结果，再继续提交
+                while window and (len(window) >= window_size or window[0][2] is None):
+                    yield self._take_parsed(*window.popleft())
+            while window:
+                yield self._take_parsed(*window.popleft())
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    def _parse_cache_key(self, file_path: str) -> Optional[Tuple[str, int, int]]:
+        """返回需要子进程解析的文件的缓存键；已缓存、无法访问或过大的文件返回 None"""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        if stat.st_size > self.MAX_FILE_SIZE:
+            return None
+        cache_key = (file_path, stat.st_mtime_ns, stat.st_size)
+        return None if self._get_cached(cache_key) is not None else cache_key
+    
+    def _take_parsed(self, file_path: str, cache_key: Optional[Tuple[str, int, int]],
+                     future) -> Tuple[str, Optional[str]]:
+        """取出一个文件的解析结果：子进程的结果写入缓存，其余文件在当前进程解析"""
+        if future is None:
+            return file_path, self.parse(file_path)
+        _, content = future.result()
+        if content is not None:
+            self._cache_content(cache_key, content)
+        return file_path, content
+    
+    def _get_cached(self, cache_key: Tuple[str, int, int]) -> Optional[str]:
+        with self._cache_lock:
+            content = self._cache.get(cache_key)
+            if content is not None:
+                self._cache.move_to_end(cache_key)
+            return content
+    
+    def _cache_content(self, cache_key: Tuple[str, int, int], content: str) -> None:
+        """缓存解析结果，总字符数超出预算时淘汰最久未使用的条目"""
+        if len(content) > self._cache_max_chars:
+            return
+        with self._cache_lock:
+            old = self._cache.pop(cache_key, None)
+            if old is not None:
+                self._cache_chars -= len(old)
+            self._cache[cache_key] = content
+            self._cache_chars += len(content)
+            while self._cache_chars > self._cache_max_chars:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_chars -= len(evicted)
+    
     def get_supported_extensions(self) -> set:
         """获取所有支持的扩展名"""
-        extensions = set()
-        for parser in self.parsers:
-            if hasattr(parser, 'supported_extensions'):
-                extensions.update(parser.supported_extensions)
-        return extensions
+        return set(self._ext_map)
     
     def is_supported(self, file_path: str) -> bool:
         """检查文件是否支持"""
@@ -320,14 +757,19 @@ class FileParser:
 # 全局解析器实例
 _parser_instance: Optional[FileParser] = None
 
-def get_parser() -> FileParser:
-    """获取全局文件解析器"""
+def get_parser(cache_size_mb: Optional[int] = None) -> FileParser:
+    """获取全局文件解析器（cache_size_mb 仅在首次创建时生效）"""
     global _parser_instance
     if _parser_instance is None:
-        _parser_instance = FileParser()
+        _parser_instance = FileParser() if cache_size_mb is None else FileParser(cache_size_mb)
     return _parser_instance
 
 
+def _parse_in_worker(file_path: str) -> Tuple[str, Optional[str]]:
+    """进程池工作函数：使用子进程自己的全局解析器（FileParser 含锁，不能直接序列化）"""
+    return file_path, get_parser().parse(file_path)
+
+
 if __name__ == "__main__":
     # 测试解析器
     parser = get_parser()
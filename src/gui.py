@@ -8,14 +8,14 @@
 import sys
 import os
 import time
-import webbrowser
+from collections import OrderedDict, deque
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Dict, Any, Optional
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLineEdit, QPushButton, QTextEdit, QTableWidget, QTableWidgetItem,
+    QLineEdit, QPushButton, QTextEdit, QTableView,
     QLabel, QSplitter, QGroupBox, QComboBox, QSpinBox, QCheckBox,
     QStatusBar, QMenuBar, QMenu, QToolBar, QFileDialog, QMessageBox,
     QProgressDialog, QAbstractItemView, QHeaderView, QFrame,
@@ -23,16 +23,161 @@ from PyQt6.QtWidgets import (
     QStyle, QSizePolicy, QDialog, QProgressBar
 )
 from PyQt6.QtCore import (
-    Qt, QTimer, QThread, pyqtSignal, QSize, QDate, QSettings,
-    QRegularExpression, QPoint, QRect
+    Qt, QTimer, QThread, QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot,
+    QSize, QDate, QSettings,
+    QRegularExpression, QPoint, QRect, QAbstractTableModel, QModelIndex
 )
 from PyQt6.QtGui import (
     QFont, QIcon, QColor, QPalette, QAction, QKeySequence,
-    QDesktopServices, QShortcut, QPainter, QPen, QConicalGradient
+    QDesktopServices, QShortcut, QPainter, QPen, QConicalGradient, QTextCursor
 )
 from loguru import logger
 
 from .config import get_config
+from .workers import AIWorker
+
+# NumPy 模块（首次按数值列排序时才导入，未安装时为 False）
+_numpy = None
+
+
+def _get_numpy():
+    """获取 NumPy 模块：可选依赖（随 llama-cpp-python 一起安装），未安装时返回 None"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _numpy = numpy
+    return _numpy or None
+
+
+# 深色主题样式表（模块级常量，只在导入时构建一次）
+_DARK_QSS = """
+    QMainWindow {
+        background-color: #1e1e1e;
+    }
+    QWidget {
+        background-color: #2b2b2b;
+        color: #ffffff;
+    }
+    QGroupBox {
+        border: 1px solid #555;
+        border-radius: 5px;
+        margin-top: 10px;
+        padding-top: 10px;
+        font-weight: bold;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 5px;
+    }
+    QLineEdit {
+        background-color: #3c3c3c;
+        border: 1px solid #555;
+        border-radius: 5px;
+        padding: 5px 10px;
+        color: #ffffff;
+    }
+    QLineEdit:focus {
+        border: 1px solid #0078d4;
+    }
+    QPushButton {
+        background-color: #0078d4;
+        border: none;
+        border-radius: 5px;
+        padding: 8px 16px;
+        color: white;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #1e8ae6;
+    }
+    QPushButton:pressed {
+        background-color: #006cbd;
+    }
+    QPushButton:disabled {
+        background-color: #555;
+        color: #999;
+    }
+    QTableView {
+        background-color: #2b2b2b;
+        border: 1px solid #555;
+        gridline-color: #444;
+        color: #ffffff;
+    }
+    QTableView::item {
+        padding: 5px;
+        color: #ffffff;
+    }
+    QTableView::item:selected {
+        background-color: #0078d4;
+        color: #ffffff;
+    }
+    QTableView::item:alternate {
+        background-color: #333333;
+        color: #ffffff;
+    }
+    QHeaderView::section {
+        background-color: #3c3c3c;
+        padding: 5px;
+        border: 1px solid #555;
+        font-weight: bold;
+        color: #ffffff;
+    }
+    QComboBox {
+        background-color: #3c3c3c;
+        border: 1px solid #555;
+        border-radius: 3px;
+        padding: 5px;
+        color: white;
+    }
+    QSpinBox {
+        background-color: #3c3c3c;
+        border: 1px solid #555;
+        border-radius: 3px;
+        padding: 5px;
+        color: white;
+    }
+    QDateEdit {
+        background-color: #3c3c3c;
+        border: 1px solid #555;
+        border-radius: 3px;
+        padding: 5px;
+        color: white;
+    }
+    QCheckBox {
+        color: white;
+    }
+    QMenuBar {
+        background-color: #2b2b2b;
+        color: white;
+    }
+    QMenuBar::item:selected {
+        background-color: #0078d4;
+    }
+    QMenu {
+        background-color: #2b2b2b;
+        color: white;
+        border: 1px solid #555;
+    }
+    QMenu::item:selected {
+        background-color: #0078d4;
+    }
+    QStatusBar {
+        background-color: #007acc;
+        color: white;
+    }
+    QToolBar {
+        background-color: #2b2b2b;
+        border: none;
+        spacing: 5px;
+    }
+    QSplitter::handle {
+        background-color: #555;
+    }
+"""
 
 
 class SpinningIndicator(QWidget):
@@ -384,18 +529,25 @@ class IndexWorker(QThread):
         self._cancelled = True
 
 
-class SearchThread(QThread):
-    """搜索线程 - 避免UI假死"""
-    finished = pyqtSignal(list, float)  # results, elapsed_time
-    error = pyqtSignal(str)
+class SearchSignals(QObject):
+    """搜索任务的信号（QRunnable 不是 QObject，不能直接定义信号）"""
+    finished = pyqtSignal(int, list, float)  # seq, results, elapsed_time
+    error = pyqtSignal(int, str)  # seq, error_msg
 
-    def __init__(self, indexer, query, limit, filters):
+
+class SearchTask(QRunnable):
+    """搜索任务 - 在全局线程池中执行，避免UI假死，也不必为每次搜索创建线程"""
+
+    def __init__(self, signals: SearchSignals, seq: int, indexer, query, limit, filters):
         super().__init__()
+        self.signals = signals
+        self.seq = seq
         self.indexer = indexer
         self.query = query
         self.limit = limit
         self.filters = filters
         self._is_cancelled = False
+        self.setAutoDelete(True)
 
     def run(self):
         try:
@@ -405,10 +557,10 @@ class SearchThread(QThread):
 
             # 检查是否已取消
             if not self._is_cancelled:
-                self.finished.emit(results, elapsed)
+                self.signals.finished.emit(self.seq, results, elapsed)
         except Exception as e:
             if not self._is_cancelled:
-                self.error.emit(str(e))
+                self.signals.error.emit(self.seq, str(e))
 
     def cancel(self):
         """取消搜索"""
@@ -456,107 +608,263 @@ class AISearchThread(QThread):
             self.error.emit(str(e))
 
 
-class SearchResultTable(QTableWidget):
+class SearchResultModel(QAbstractTableModel):
+    """搜索结果数据模型，只在视图需要时才为可见单元格提供数据"""
+    
+    HEADERS = ['文件名', '路径', '大小', '修改时间', '匹配度']
+    
+    # 数值列排序时使用的 NumPy 类型：大小、修改时间、匹配度
+    NUMERIC_DTYPES = {2: 'int64', 3: 'float64', 4: 'float64'}
+    
+    # 每批加入的行数：先显示第一批，其余在事件循环空闲时分批加入，结果很多时界面不卡顿
+    CHUNK_SIZE = 100
+    
+    # 已加入的行数、结果总数
+    rows_loaded = pyqtSignal(int, int)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[Dict[str, Any]] = []
+        self._loaded = 0
+        self._load_generation = 0
+        # 按列预先格式化好的显示文本和排序键，data() 只需按下标取值
+        self._display_columns: List[List[str]] = [[] for _ in self.HEADERS]
+        self._sort_columns: List[list] = [[] for _ in self.HEADERS]
+        # 排序只记录行的排列顺序：视图第 i 行对应结果 _order[i]，None 表示按匹配度原序
+        self._order: Optional[List[int]] = None
+        self._sort_column = -1
+        self._sort_order = Qt.SortOrder.AscendingOrder
+        # 数值列的 NumPy 数组，每个结果集只在首次按该列排序时构建一次
+        self._sort_arrays: Dict[int, Any] = {}
+    
+    def set_rows(self, rows: List[Dict[str, Any]]):
+        """替换全部结果（直接引用结果列表，不复制）"""
+        self.beginResetModel()
+        self._rows = rows
+        names = []
+        self._display_columns = [names, [], [], [], []]
+        self._sort_columns = [names, [], [], [], []]
+        self._sort_arrays = {}
+        self._loaded = 0
+        self._load_generation += 1
+        if self._sort_column < 0:
+            self._order = None
+            self._append_rows(min(len(rows), self.CHUNK_SIZE))
+        else:
+            # 已按某列排序时需要全部行才能排出顺序，不再分批
+            self._append_rows(len(rows))
+            self._order = self._compute_order()
+        self.endResetModel()
+        self._schedule_next_chunk()
+    
+    def _schedule_next_chunk(self):
+        """通知加载进度，还有剩余的行时安排下一批"""
+        self.rows_loaded.emit(self._loaded, len(self._rows))
+        if self._loaded < len(self._rows):
+            generation = self._load_generation
+            QTimer.singleShot(0, lambda: self._load_next_chunk(generation))
+    
+    def _load_next_chunk(self, generation: int):
+        """加入下一批行"""
+        # 结果已被替换，放弃旧结果的剩余部分
+        if generation != self._load_generation or self._loaded >= len(self._rows):
+            return
+        
+        end = min(len(self._rows), self._loaded + self.CHUNK_SIZE)
+        self.beginInsertRows(QModelIndex(), self._loaded, end - 1)
+        self._append_rows(end)
+        self.endInsertRows()
+        self._schedule_next_chunk()
+    
+    def _append_rows(self, end: int):
+        """格式化从已加入行数到 end 的各行并追加到各列，排序和重绘时不再重复格式化"""
+        names, paths, sizes_fmt, times_fmt, scores_fmt = self._display_columns
+        _, full_paths, sizes, timestamps, scores = self._sort_columns
+        
+        for result in self._rows[self._loaded:end]:
+            names.append(result.get('filename', ''))
+            
+            # 显示相对路径或截断路径
+            path = result.get('path', '')
+            full_paths.append(path)
+            paths.append(path if len(path) <= 80 else '...' + path[-77:])
+            
+            size = result.get('size', 0) or 0
+            sizes.append(size)
+            sizes_fmt.append(format_size(size))
+            
+            modified = result.get('modified')
+            if isinstance(modified, datetime):
+                times_fmt.append(modified.strftime('%Y-%m-%d %H:%M'))
+                timestamps.append(modified.timestamp())
+            else:
+                times_fmt.append(str(modified) if modified else '-')
+                timestamps.append(0.0)
+            
+            score = result.get('score', 0)
+            scores.append(float(score or 0))
+            scores_fmt.append(f"{score:.2f}" if score else "-")
+        
+        self._loaded = end
+    
+    def sort(self, column: int, order=Qt.SortOrder.AscendingOrder):
+        """按列排序，column 为 -1 时恢复按匹配度的原始顺序"""
+        # 排序需要全部行，先把还没分批加入的行一次加入
+        if column >= 0 and self._loaded < len(self._rows):
+            self._load_generation += 1
+            self.beginInsertRows(QModelIndex(), self._loaded, len(self._rows) - 1)
+            self._append_rows(len(self._rows))
+            self.endInsertRows()
+            self.rows_loaded.emit(self._loaded, len(self._rows))
+        
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [self._source_row(index.row()) for index in persistent]
+        
+        self._sort_column = column
+        self._sort_order = order
+        self._order = self._compute_order()
+        
+        # 选中行等持久索引跟随结果移动到新位置
+        if persistent:
+            self.changePersistentIndexList(persistent, [
+                self.index(self._order.index(source) if self._order is not None else source,
+                           index.column())
+                for index, source in zip(persistent, sources)
+            ])
+        self.layoutChanged.emit()
+    
+    def _compute_order(self) -> Optional[List[int]]:
+        """计算当前排序列的行排列，数值列有 NumPy 时用 argsort 在 C 层完成比较"""
+        column = self._sort_column
+        if column < 0:
+            return None
+        
+        keys = self._sort_columns[column]
+        descending = self._sort_order == Qt.SortOrder.DescendingOrder
+        dtype = self.NUMERIC_DTYPES.get(column)
+        np = _get_numpy() if dtype is not None else None
+        if np is not None:
+            values = self._sort_arrays.get(column)
+            if values is None:
+                values = np.asarray(keys, dtype=dtype)
+                self._sort_arrays[column] = values
+            return np.argsort(-values if descending else values, kind='stable').tolist()
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=descending)
+    
+    def _source_row(self, row: int) -> int:
+        """视图行号对应的结果下标"""
+        return self._order[row] if self._order is not None else row
+    
+    def result_at(self, row: int) -> Dict[str, Any]:
+        """获取视图中指定行（经过排序）的结果"""
+        return self._rows[self._source_row(row)]
+    
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._loaded
+    
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        row = index.row()
+        if self._order is not None:
+            row = self._order[row]
+        column = index.column()
+        
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self._display_columns[column][row]
+        if role == Qt.ItemDataRole.ToolTipRole and column == 1:
+            return self._sort_columns[1][row]
+        return None
+
+
+def format_size(size: int) -> str:
+    """格式化文件大小"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class SearchResultTable(QTableView):
     """搜索结果表格组件"""
     
+    # 选中的结果变化
+    selection_changed = pyqtSignal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setup_ui()
     
     def setup_ui(self):
         """设置界面"""
-        # 设置列
-        self.setColumnCount(5)
-        self.setHorizontalHeaderLabels(['文件名', '路径', '大小', '修改时间', '匹配度'])
+        # 数据模型，点击表头时由模型按原始值计算行的排列
+        self.result_model = SearchResultModel(self)
+        self.setModel(self.result_model)
         
         # 设置选择行为
         self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
         self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
         self.setAlternatingRowColors(True)
-        self.setSortingEnabled(True)
         
         # 设置列宽
         header = self.horizontalHeader()
+        # 默认保持匹配度顺序，点击表头后才排序
+        header.setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.setSortingEnabled(True)
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Interactive)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.ResizeToContents)
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.ResizeToContents)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)
+        # 自适应列宽只参考可见行，避免每次显示结果都遍历前 1000 行计算宽度
+        header.setResizeContentsPrecision(0)
         
         # 设置行高
         self.verticalHeader().setDefaultSectionSize(30)
         
         # 双击打开文件
-        self.cellDoubleClicked.connect(self.on_double_click)
+        self.doubleClicked.connect(self.on_double_click)
     
     def display_results(self, results: List[Dict[str, Any]]):
         """显示搜索结果"""
-        # 禁用更新以提高性能
-        self.setUpdatesEnabled(False)
-
-        try:
-            self.setRowCount(len(results))
-
-            for row, result in enumerate(results):
-                # 文件名
-                filename_item = QTableWidgetItem(result.get('filename', ''))
-                filename_item.setData(Qt.ItemDataRole.UserRole, result)
-                self.setItem(row, 0, filename_item)
-
-                # 路径
-                path = result.get('path', '')
-                # 显示相对路径或截断路径
-                display_path = path if len(path) <= 80 else '...' + path[-77:]
-                path_item = QTableWidgetItem(display_path)
-                path_item.setToolTip(path)
-                self.setItem(row, 1, path_item)
-
-                # 大小
-                size = result.get('size', 0)
-                size_str = self._format_size(size)
-                size_item = QTableWidgetItem(size_str)
-                size_item.setData(Qt.ItemDataRole.UserRole, size)  # 用于排序
-                self.setItem(row, 2, size_item)
-
-                # 修改时间
-                modified = result.get('modified')
-                if modified:
-                    if isinstance(modified, datetime):
-                        time_str = modified.strftime('%Y-%m-%d %H:%M')
-                    else:
-                        time_str = str(modified)
-                else:
-                    time_str = '-'
-                time_item = QTableWidgetItem(time_str)
-                self.setItem(row, 3, time_item)
-
-                # 匹配度
-                score = result.get('score', 0)
-                score_str = f"{score:.2f}" if score else "-"
-                score_item = QTableWidgetItem(score_str)
-                self.setItem(row, 4, score_item)
-        finally:
-            # 重新启用更新
-            self.setUpdatesEnabled(True)
+        self.result_model.set_rows(results)
+    
+    def clear_results(self):
+        """清空搜索结果"""
+        self.result_model.set_rows([])
+    
+    def row_count(self) -> int:
+        """当前显示的结果数"""
+        return self.result_model.rowCount()
+    
+    def selectionChanged(self, selected, deselected):
+        super().selectionChanged(selected, deselected)
+        self.selection_changed.emit()
     
     def _format_size(self, size: int) -> str:
         """格式化文件大小"""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024:
-                return f"{size:.1f} {unit}"
-            size /= 1024
-        return f"{size:.1f} TB"
+        return format_size(size)
     
-    def on_double_click(self, row: int, column: int):
+    @pyqtSlot(QModelIndex)
+    def on_double_click(self, index: QModelIndex):
         """双击事件处理"""
         try:
-            item = self.item(row, 0)
-            if item:
-                result = item.data(Qt.ItemDataRole.UserRole)
-                if result:
-                    path = result.get('path', '')
-                    self.open_file(path)
+            result = self._result_at(index)
+            if result:
+                path = result.get('path', '')
+                self.open_file(path)
         except Exception as e:
             from loguru import logger
             logger.error(f"双击打开文件失败: {e}")
@@ -575,13 +883,16 @@ class SearchResultTable(QTableWidget):
     
     def get_selected_file(self) -> Optional[Dict[str, Any]]:
         """获取选中的文件"""
-        selected = self.selectedItems()
+        selected = self.selectionModel().selectedRows()
         if selected:
-            row = selected[0].row()
-            item = self.item(row, 0)
-            if item:
-                return item.data(Qt.ItemDataRole.UserRole)
+            return self._result_at(selected[0])
         return None
+    
+    def _result_at(self, index: QModelIndex) -> Optional[Dict[str, Any]]:
+        """视图中的索引（经过排序）对应的结果，直接从模型的结果列表中取"""
+        if not index.isValid():
+            return None
+        return self.result_model.result_at(index.row())
 
 
 class FilterPanel(QWidget):
@@ -591,6 +902,8 @@ class FilterPanel(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        # 上次构建的筛选条件，任一控件变化时失效
+        self._cached_filters: Optional[Dict[str, Any]] = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -634,6 +947,8 @@ class FilterPanel(QWidget):
         size_layout.addWidget(self.size_min)
         size_layout.addWidget(QLabel("最大:"))
         size_layout.addWidget(self.size_max)
+        self.size_min.valueChanged.connect(self._invalidate_filters)
+        self.size_max.valueChanged.connect(self._invalidate_filters)
         
         # 启用大小筛选
         self.size_enabled = QCheckBox("启用大小筛选")
@@ -658,6 +973,8 @@ class FilterPanel(QWidget):
         time_layout.addWidget(self.date_from)
         time_layout.addWidget(QLabel("到:"))
         time_layout.addWidget(self.date_to)
+        self.date_from.dateChanged.connect(self._invalidate_filters)
+        self.date_to.dateChanged.connect(self._invalidate_filters)
         
         # 启用时间筛选
         self.time_enabled = QCheckBox("启用时间筛选")
@@ -690,7 +1007,10 @@ class FilterPanel(QWidget):
         layout.addStretch()
     
     def get_filters(self) -> Dict[str, Any]:
-        """获取当前筛选条件"""
+        """获取当前筛选条件（控件未变化时复用上次的结果）"""
+        if self._cached_filters is not None:
+            return dict(self._cached_filters)
+        
         filters = {}
         
         # 文件类型
@@ -728,12 +1048,21 @@ class FilterPanel(QWidget):
         filters['fuzzy'] = self.fuzzy_search.isChecked()
         filters['search_content'] = self.content_search.isChecked()
         
-        return filters
+        self._cached_filters = filters
+        return dict(filters)
+    
+    @pyqtSlot()
+    def _invalidate_filters(self):
+        """筛选控件变化，下次获取时重新构建"""
+        self._cached_filters = None
     
+    @pyqtSlot()
     def emit_filters(self):
         """发送筛选条件变更信号"""
+        self._cached_filters = None
         self.filters_changed.emit(self.get_filters())
     
+    @pyqtSlot()
     def reset_filters(self):
         """重置筛选条件"""
         self.type_combo.setCurrentIndex(0)
@@ -863,6 +1192,16 @@ class AIAnswerArea(QTextEdit):
             size /= 1024
         return f"{size:.1f} TB"
 
+    def begin_streaming_answer(self):
+        """开始逐段显示 AI 回答"""
+        self.setPlainText("🤖 AI 回答:\n\n")
+
+    def append_answer_text(self, text: str):
+        """在回答末尾追加一段文本"""
+        self.moveCursor(QTextCursor.MoveOperation.End)
+        self.insertPlainText(text)
+        self.ensureCursorVisible()
+
     def clear_answer(self):
         """清空回答"""
         self.clear()
@@ -871,6 +1210,12 @@ class AIAnswerArea(QTextEdit):
 class MainWindow(QMainWindow):
     """主窗口"""
 
+    # 搜索结果缓存的最大条目数
+    SEARCH_CACHE_SIZE = 64
+
+    # AI 引擎后台探测后端完成（从探测线程发出）
+    ai_backend_ready = pyqtSignal(str)
+
     def __init__(self, indexer=None, ai_engine=None, config=None):
         super().__init__()
 
@@ -880,9 +1225,10 @@ class MainWindow(QMainWindow):
         self.logger = logger.bind(module="gui")
         self.logger.info("MainWindow 初始化开始")
 
-        # 搜索历史
-        self.search_history = []
+        # 搜索历史：最新的在最前，超出上限时自动丢弃最旧的；集合用于快速判断是否已存在
         self.max_history = 50
+        self.search_history = deque(maxlen=self.max_history)
+        self._history_set = set()
 
         # 索引更新相关状态
         self._is_indexing = False
@@ -909,13 +1255,29 @@ class MainWindow(QMainWindow):
         # 连接信号
         self.connect_signals()
 
-        # 初始化状态
+        # 初始化状态，AI 后端探测完成后再刷新一次
         self.update_status()
-
-        # 搜索线程
-        self.search_thread = None
+        self.ai_backend_ready.connect(self._on_ai_backend_ready)
+        self._watch_ai_backend()
+
+        # 搜索任务（在全局线程池中执行），序号用于丢弃被新搜索取代的结果
+        self.search_task = None
+        self._search_seq = 0
+        self._pending_search_key = None
+        self._search_signals = SearchSignals(self)
+        self._search_signals.finished.connect(self._on_search_finished)
+        self._search_signals.error.connect(self._on_search_error)
         self.ai_search_thread = None
 
+        # AI 回答生成线程（流式显示，可停止）
+        self.ai_answer_worker: Optional[AIWorker] = None
+        self._ai_answer_streamed = False
+        self._ai_answer_stopped = False
+        self._ai_answer_intent = ""
+        
+        # 搜索结果缓存：(搜索类型, 查询, 过滤条件) -> 结果，索引或配置变化后清空
+        self._search_cache: OrderedDict = OrderedDict()
+
         # 设置自动更新索引定时器（使用配置中的update_interval，默认300秒）
         self._auto_update_timer = QTimer(self)
         update_interval = self.config.index.update_interval * 1000  # 转换为毫秒
@@ -977,6 +1339,13 @@ class MainWindow(QMainWindow):
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.search_btn)
         search_layout.addWidget(self.ai_btn)
+
+        # 停止生成 AI 回答，只在生成过程中显示
+        self.stop_ai_btn = QPushButton("停止")
+        self.stop_ai_btn.setMinimumHeight(40)
+        self.stop_ai_btn.setToolTip("停止生成 AI 回答")
+        self.stop_ai_btn.setVisible(False)
+        search_layout.addWidget(self.stop_ai_btn)
         
         right_layout.addWidget(search_frame)
         
@@ -998,6 +1367,8 @@ class MainWindow(QMainWindow):
         
         # 结果信息标签
         self.result_info_label = QLabel("共 0 个结果")
+        self._result_info_text = "共 0 个结果"
+        self._result_loading_text = ""
         results_layout.addWidget(self.result_info_label)
         
         right_layout.addWidget(results_group, stretch=1)
@@ -1164,13 +1535,15 @@ class MainWindow(QMainWindow):
         self.search_input.returnPressed.connect(self.perform_search)
         self.search_btn.clicked.connect(self.perform_search)
         self.ai_btn.clicked.connect(self.perform_ai_search)
+        self.stop_ai_btn.clicked.connect(self.stop_ai_answer)
 
         # 筛选器
         self.filter_panel.filters_changed.connect(self.on_filters_changed)
 
         # 结果表格
-        self.result_table.itemSelectionChanged.connect(self.on_selection_changed)
-        self.result_table.cellClicked.connect(self.on_cell_clicked)
+        self.result_table.selection_changed.connect(self.on_selection_changed)
+        self.result_table.result_model.rows_loaded.connect(self._on_result_rows_loaded)
+        self.result_table.clicked.connect(self.on_cell_clicked)
 
     def resizeEvent(self, event):
         """窗口大小改变事件 - 确保转圈动画在右下角"""
@@ -1257,131 +1630,7 @@ class MainWindow(QMainWindow):
         theme = self.config.gui.theme
         
         if theme == "dark":
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #1e1e1e;
-                }
-                QWidget {
-                    background-color: #2b2b2b;
-                    color: #ffffff;
-                }
-                QGroupBox {
-                    border: 1px solid #555;
-                    border-radius: 5px;
-                    margin-top: 10px;
-                    padding-top: 10px;
-                    font-weight: bold;
-                }
-                QGroupBox::title {
-                    subcontrol-origin: margin;
-                    left: 10px;
-                    padding: 0 5px;
-                }
-                QLineEdit {
-                    background-color: #3c3c3c;
-                    border: 1px solid #555;
-                    border-radius: 5px;
-                    padding: 5px 10px;
-                    color: #ffffff;
-                }
-                QLineEdit:focus {
-                    border: 1px solid #0078d4;
-                }
-                QPushButton {
-                    background-color: #0078d4;
-                    border: none;
-                    border-radius: 5px;
-                    padding: 8px 16px;
-                    color: white;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #1e8ae6;
-                }
-                QPushButton:pressed {
-                    background-color: #006cbd;
-                }
-                QPushButton:disabled {
-                    background-color: #555;
-                    color: #999;
-                }
-                QTableWidget {
-                    background-color: #2b2b2b;
-                    border: 1px solid #555;
-                    gridline-color: #444;
-                    color: #ffffff;
-                }
-                QTableWidget::item {
-                    padding: 5px;
-                    color: #ffffff;
-                }
-                QTableWidget::item:selected {
-                    background-color: #0078d4;
-                    color: #ffffff;
-                }
-                QTableWidget::item:alternate {
-                    background-color: #333333;
-                    color: #ffffff;
-                }
-                QHeaderView::section {
-                    background-color: #3c3c3c;
-                    padding: 5px;
-                    border: 1px solid #555;
-                    font-weight: bold;
-                    color: #ffffff;
-                }
-                QComboBox {
-                    background-color: #3c3c3c;
-                    border: 1px solid #555;
-                    border-radius: 3px;
-                    padding: 5px;
-                    color: white;
-                }
-                QSpinBox {
-                    background-color: #3c3c3c;
-                    border: 1px solid #555;
-                    border-radius: 3px;
-                    padding: 5px;
-                    color: white;
-                }
-                QDateEdit {
-                    background-color: #3c3c3c;
-                    border: 1px solid #555;
-                    border-radius: 3px;
-                    padding: 5px;
-                    color: white;
-                }
-                QCheckBox {
-                    color: white;
-                }
-                QMenuBar {
-                    background-color: #2b2b2b;
-                    color: white;
-                }
-                QMenuBar::item:selected {
-                    background-color: #0078d4;
-                }
-                QMenu {
-                    background-color: #2b2b2b;
-                    color: white;
-                    border: 1px solid #555;
-                }
-                QMenu::item:selected {
-                    background-color: #0078d4;
-                }
-                QStatusBar {
-                    background-color: #007acc;
-                    color: white;
-                }
-                QToolBar {
-                    background-color: #2b2b2b;
-                    border: none;
-                    spacing: 5px;
-                }
-                QSplitter::handle {
-                    background-color: #555;
-                }
-            """)
+            self.setStyleSheet(_DARK_QSS)
         else:
             # Light theme
             self.setStyleSheet("")
@@ -1403,7 +1652,11 @@ class MainWindow(QMainWindow):
         # 搜索历史
         history = settings.value("searchHistory", [])
         if history:
-            self.search_history = history[:self.max_history]
+            # 只有一条记录时 QSettings 可能返回字符串
+            if isinstance(history, str):
+                history = [history]
+            self.search_history = deque(history[:self.max_history], maxlen=self.max_history)
+            self._history_set = set(self.search_history)
     
     def save_settings(self):
         """保存设置"""
@@ -1411,7 +1664,7 @@ class MainWindow(QMainWindow):
         
         settings.setValue("geometry", self.saveGeometry())
         settings.setValue("windowState", self.saveState())
-        settings.setValue("searchHistory", self.search_history)
+        settings.setValue("searchHistory", list(self.search_history))
     
     def update_status(self):
         """更新状态"""
@@ -1434,6 +1687,7 @@ class MainWindow(QMainWindow):
             self.ai_status_label.setText("AI: 禁用")
             self.ai_btn.setEnabled(False)
 
+    @pyqtSlot(str)
     def on_search_text_changed(self, text: str):
         """搜索文本变化 - 不自动搜索，只更新状态"""
         # 不再自动搜索，等待用户按Enter键或点击搜索按钮
@@ -1442,50 +1696,77 @@ class MainWindow(QMainWindow):
         else:
             self.status_label.setText("就绪")
     
+    @pyqtSlot()
     def perform_search(self):
         """执行普通搜索"""
         query = self.search_input.text().strip()
         if not query:
             return
 
-        # 如果有正在进行的搜索，等待它完成
-        if self.search_thread and self.search_thread.isRunning():
-            self.logger.warning("搜索正在进行中，跳过新搜索请求")
-            return
+        # 正在生成的 AI 回答属于上一次搜索，停止并丢弃
+        self._discard_ai_answer()
+
+        # 如果有正在进行的搜索，丢弃它的结果，直接开始新的搜索
+        self._search_seq += 1
+        if self.search_task:
+            self.search_task.cancel()
+            self.search_task = None
 
         self.logger.info(f"开始搜索: '{query}'")
 
         # 添加到搜索历史
-        if query not in self.search_history:
-            self.search_history.insert(0, query)
-            self.search_history = self.search_history[:self.max_history]
+        if query not in self._history_set:
+            if len(self.search_history) == self.max_history:
+                self._history_set.discard(self.search_history[-1])
+            self.search_history.appendleft(query)
+            self._history_set.add(query)
 
         # 获取筛选条件
         filters = self.filter_panel.get_filters()
         self.logger.debug(f"搜索过滤条件: {filters}")
 
+        # 相同的查询和筛选条件直接使用缓存的结果
+        cache_key = self._search_cache_key('search', query, filters)
+        cached = self._get_cached_search(cache_key)
+        if cached is not None:
+            self.logger.debug("使用缓存的搜索结果")
+            self._show_search_results(cached, 0.0)
+            return
+
         # 更新UI状态
         self.status_label.setText("搜索中...")
         self.ai_answer_area.display_answer("正在搜索...", is_ai=False)
 
-        # 创建搜索线程
-        self.search_thread = SearchThread(
+        # 提交搜索任务
+        self.search_task = SearchTask(
+            self._search_signals,
+            self._search_seq,
             self.indexer,
             query,
             self.config.gui.max_results,
             filters
         )
-        self.search_thread.finished.connect(self._on_search_finished)
-        self.search_thread.error.connect(self._on_search_error)
-        self.search_thread.start()
+        self._pending_search_key = cache_key
+        QThreadPool.globalInstance().start(self.search_task)
 
-    def _on_search_finished(self, results: List[Dict], elapsed: float):
+    @pyqtSlot(int, list, float)
+    def _on_search_finished(self, seq: int, results: List[Dict], elapsed: float):
         """搜索完成回调"""
+        # 忽略已被新搜索取代的结果（取消前可能已经发出）
+        if seq != self._search_seq:
+            return
+        
+        self.search_task = None
+        self._cache_search(self._pending_search_key, results)
+        self._show_search_results(results, elapsed)
+
+    def _show_search_results(self, results: List[Dict], elapsed: float):
+        """显示普通搜索的结果"""
         self.logger.info(f"搜索完成: 找到 {len(results)} 个结果, 耗时 {elapsed:.2f}秒")
 
         # 显示结果
         self.result_table.display_results(results)
-        self.result_info_label.setText(f"共 {len(results)} 个结果 ({elapsed:.2f}秒)")
+        self._set_result_info(f"共 {len(results)} 个结果 ({elapsed:.2f}秒)")
 
         # 更新状态
         self.status_label.setText(f"搜索完成，找到 {len(results)} 个结果")
@@ -1497,13 +1778,41 @@ class MainWindow(QMainWindow):
         else:
             self.ai_answer_area.display_answer("未找到匹配的文件。", is_ai=False, keywords=query.split())
 
-    def _on_search_error(self, error_msg: str):
+    @pyqtSlot(int, str)
+    def _on_search_error(self, seq: int, error_msg: str):
         """搜索错误回调"""
+        if seq != self._search_seq:
+            return
+        
+        self.search_task = None
         self.logger.error(f"搜索失败: {error_msg}")
         QMessageBox.warning(self, "搜索错误", f"搜索失败: {error_msg}")
         self.status_label.setText("搜索失败")
         self.ai_answer_area.display_answer(f"搜索失败: {error_msg}", is_ai=False)
     
+    @staticmethod
+    def _search_cache_key(kind: str, query: str, filters: Dict[str, Any]) -> tuple:
+        """生成搜索缓存的键（过滤条件中的列表转为元组）"""
+        return (kind, query, tuple(sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in filters.items()
+        )))
+
+    def _get_cached_search(self, key: tuple):
+        """获取缓存的搜索结果"""
+        value = self._search_cache.get(key)
+        if value is not None:
+            self._search_cache.move_to_end(key)
+        return value
+
+    def _cache_search(self, key: tuple, value):
+        """缓存搜索结果，超出容量时淘汰最久未使用的条目"""
+        self._search_cache[key] = value
+        self._search_cache.move_to_end(key)
+        while len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+
+    @pyqtSlot()
     def perform_ai_search(self):
         """执行 AI 搜索"""
         query = self.search_input.text().strip()
@@ -1518,12 +1827,25 @@ class MainWindow(QMainWindow):
         if self.ai_search_thread and self.ai_search_thread.isRunning():
             return
 
+        # 正在生成的 AI 回答属于上一次搜索，停止并丢弃
+        self._discard_ai_answer()
+
         self.status_label.setText("AI 分析中...")
         self.ai_answer_area.display_answer("正在分析您的查询，请稍候...", is_ai=True)
 
         # 获取筛选条件
         filters = self.filter_panel.get_filters()
 
+        # 相同的查询和筛选条件直接使用缓存的分析和结果；
+        # "最近7天"等相对时间解析为当天的绝对日期，因此键中带上日期，跨天后重新分析
+        cache_key = self._search_cache_key('ai', query, filters) + (date.today(),)
+        cached = self._get_cached_search(cache_key)
+        if cached is not None:
+            self.logger.debug("使用缓存的 AI 搜索结果")
+            analysis, results = cached
+            self._on_ai_search_finished(analysis, results, 0.0)
+            return
+
         # 创建AI搜索线程
         self.ai_search_thread = AISearchThread(
             self.ai_engine,
@@ -1533,40 +1855,107 @@ class MainWindow(QMainWindow):
             filters
         )
         self.ai_search_thread.finished.connect(self._on_ai_search_finished)
+        self.ai_search_thread.finished.connect(
+            lambda analysis, results, elapsed: self._cache_search(cache_key, (analysis, results))
+        )
         self.ai_search_thread.error.connect(self._on_ai_search_error)
         self.ai_search_thread.start()
 
+    @pyqtSlot(object, list, float)
     def _on_ai_search_finished(self, analysis, results: List[Dict], elapsed: float):
         """AI搜索完成回调"""
         self.logger.debug(f"AI 分析结果: {analysis}")
 
         # 显示结果
         self.result_table.display_results(results)
-        self.result_info_label.setText(f"共 {len(results)} 个结果 (置信度: {analysis.confidence:.0%})")
+        self._set_result_info(f"共 {len(results)} 个结果 (置信度: {analysis.confidence:.0%})")
 
         # 生成 AI 回答
         query = self.search_input.text().strip()
         if results:
-            # 显示带高亮的搜索结果
+            # 先显示带高亮的搜索结果，模型可用时在后台生成回答并逐段替换显示
             self.ai_answer_area.display_search_results(query, results, is_ai=True)
-            self.status_label.setText("AI 搜索完成")
+            if self.ai_engine.can_generate():
+                self._start_ai_answer(query, results, analysis.intent)
+            else:
+                self.status_label.setText("AI 搜索完成")
         else:
             answer = f"未找到与 '{query}' 相关的文件。\n\nAI 分析: {analysis.intent}"
             self.ai_answer_area.display_answer(answer, is_ai=True, keywords=query.split())
             self.status_label.setText("AI 搜索完成")
 
-    def _generate_ai_answer(self, query: str, results: List[Dict], analysis):
-        """生成AI回答"""
-        try:
-            answer = self.ai_engine.generate_answer(query, results)
-            answer += f"\n\n意图分析: {analysis.intent}"
-            self.ai_answer_area.display_answer(answer, is_ai=True)
-            self.status_label.setText("AI 搜索完成")
-        except Exception as e:
-            self.logger.error(f"AI 生成回答失败: {e}")
-            self.ai_answer_area.display_answer(f"AI 生成回答失败: {str(e)}", is_ai=True)
-            self.status_label.setText("AI 搜索失败")
+    def _start_ai_answer(self, query: str, results: List[Dict], intent: str):
+        """在后台线程中生成 AI 回答，生成的文本逐段显示"""
+        self._discard_ai_answer()
+
+        worker = AIWorker(self.ai_engine, query, results, parent=self)
+        worker.token_ready.connect(self._on_ai_answer_token)
+        worker.response_ready.connect(self._on_ai_answer_ready)
+        worker.error.connect(self._on_ai_answer_error)
+        worker.finished.connect(worker.deleteLater)
+
+        self.ai_answer_worker = worker
+        self._ai_answer_streamed = False
+        self._ai_answer_stopped = False
+        self._ai_answer_intent = intent
+        self.stop_ai_btn.setVisible(True)
+        self.status_label.setText("AI 正在生成回答...")
+        worker.start()
+
+    @pyqtSlot()
+    def stop_ai_answer(self):
+        """停止生成 AI 回答，已生成的部分保留显示"""
+        if self.ai_answer_worker:
+            self._ai_answer_stopped = True
+            self.ai_answer_worker.cancel()
+            self.stop_ai_btn.setEnabled(False)
+            self.status_label.setText("正在停止 AI 回答...")
+
+    def _discard_ai_answer(self):
+        """停止正在生成的 AI 回答并忽略它之后的输出（开始新的搜索时调用）"""
+        if self.ai_answer_worker:
+            self.ai_answer_worker.cancel()
+            self.ai_answer_worker = None
+        self.stop_ai_btn.setVisible(False)
+        self.stop_ai_btn.setEnabled(True)
+
+    @pyqtSlot(str)
+    def _on_ai_answer_token(self, text: str):
+        """显示新生成的一段回答"""
+        if self.sender() is not self.ai_answer_worker:
+            return
+        if not self._ai_answer_streamed:
+            self._ai_answer_streamed = True
+            self.ai_answer_area.begin_streaming_answer()
+        self.ai_answer_area.append_answer_text(text)
+
+    @pyqtSlot(str)
+    def _on_ai_answer_ready(self, answer: str):
+        """AI 回答生成完成（或已停止）"""
+        if self.sender() is not self.ai_answer_worker:
+            return
+        self._discard_ai_answer()
+
+        intent_text = f"\n\n意图分析: {self._ai_answer_intent}" if self._ai_answer_intent else ""
+        if self._ai_answer_streamed:
+            self.ai_answer_area.append_answer_text(intent_text)
+        elif answer and not self._ai_answer_stopped:
+            # 后端没有逐段输出（例如回退到简单回答）时一次性显示
+            self.ai_answer_area.display_answer(answer + intent_text, is_ai=True)
+
+        self.status_label.setText("AI 回答已停止" if self._ai_answer_stopped else "AI 搜索完成")
+
+    @pyqtSlot(str)
+    def _on_ai_answer_error(self, error_msg: str):
+        """AI 回答生成失败"""
+        if self.sender() is not self.ai_answer_worker:
+            return
+        self._discard_ai_answer()
+        self.logger.error(f"AI 生成回答失败: {error_msg}")
+        self.ai_answer_area.display_answer(f"AI 生成回答失败: {error_msg}", is_ai=True)
+        self.status_label.setText("AI 搜索失败")
 
+    @pyqtSlot(str)
     def _on_ai_search_error(self, error_msg: str):
         """AI搜索错误回调"""
         self.logger.error(f"AI 搜索失败: {error_msg}")
@@ -1597,40 +1986,57 @@ class MainWindow(QMainWindow):
         
         return '\n'.join(lines)
     
+    @pyqtSlot(dict)
     def on_filters_changed(self, filters: Dict):
         """筛选条件变化"""
         # 如果有搜索内容，重新搜索
         if self.search_input.text().strip():
             self.perform_search()
     
+    def _set_result_info(self, text: str):
+        """设置结果信息，结果仍在分批加载时附加加载进度"""
+        self._result_info_text = text
+        self.result_info_label.setText(text + self._result_loading_text)
+
+    @pyqtSlot(int, int)
+    def _on_result_rows_loaded(self, loaded: int, total: int):
+        """结果表格分批加载进度"""
+        self._result_loading_text = f" · 正在加载 {loaded}/{total}..." if loaded < total else ""
+        self.result_info_label.setText(self._result_info_text + self._result_loading_text)
+
+    @pyqtSlot()
     def on_selection_changed(self):
         """选择变化"""
         pass
     
-    def on_cell_clicked(self, row: int, column: int):
+    @pyqtSlot(QModelIndex)
+    def on_cell_clicked(self, index: QModelIndex):
         """单元格点击"""
         result = self.result_table.get_selected_file()
         if result:
             # 可以在这里显示预览
             pass
     
+    @pyqtSlot()
     def clear_search(self):
         """清空搜索"""
         self.search_input.clear()
-        self.result_table.setRowCount(0)
+        self.result_table.clear_results()
         self.ai_answer_area.clear_answer()
-        self.result_info_label.setText("共 0 个结果")
+        self._set_result_info("共 0 个结果")
         self.status_label.setText("就绪")
     
+    @pyqtSlot()
     def select_next_result(self):
         """选择下一个结果"""
-        current_row = self.result_table.currentRow()
-        if current_row < self.result_table.rowCount() - 1:
+        current_row = self.result_table.currentIndex().row()
+        if current_row < self.result_table.row_count() - 1:
             self.result_table.selectRow(current_row + 1)
     
+    @pyqtSlot()
     def select_prev_result(self):
         """选择上一个结果"""
-        current_row = self.result_table.currentRow()
+        current_row = self.result_table.currentIndex().row()
         if current_row > 0:
             self.result_table.selectRow(current_row - 1)
     
@@ -1791,6 +2197,7 @@ class MainWindow(QMainWindow):
     def _on_index_complete(self, stats: Dict, progress_dialog: IndexProgressDialog, show_dialog: bool = True):
         """索引完成"""
         self._is_indexing = False
+        self._search_cache.clear()
 
         # 停止转圈动画（如果存在）
         if hasattr(self, 'spinning_indicator') and self.spinning_indicator:
@@ -1837,6 +2244,8 @@ class MainWindow(QMainWindow):
     def _on_index_error(self, error: str, progress_dialog: IndexProgressDialog, show_dialog: bool = True):
         """索引错误"""
         self._is_indexing = False
+        # 出错前可能已经提交了部分批次
+        self._search_cache.clear()
 
         # 停止转圈动画（如果存在）
         if hasattr(self, 'spinning_indicator') and self.spinning_indicator:
@@ -1910,6 +2319,7 @@ class MainWindow(QMainWindow):
             from config import reload_config
 
         self.config = reload_config()
+        self._search_cache.clear()
 
         # 重新初始化AI引擎（如果AI设置有变化）
         try:
@@ -1922,6 +2332,7 @@ class MainWindow(QMainWindow):
 
         # 重新创建AI引擎
         self.ai_engine = get_ai_engine(self.config)
+        self._watch_ai_backend()
 
         # 更新UI状态
         self.update_status()
@@ -1936,6 +2347,24 @@ class MainWindow(QMainWindow):
         else:
             self.status_label.setText("设置已保存，AI 功能已禁用")
     
+    def _watch_ai_backend(self):
+        """AI 后端探测完成时通过信号通知界面线程"""
+        if self.ai_engine:
+            self.ai_engine.on_backend_ready(self.ai_backend_ready.emit)
+
+    @pyqtSlot(str)
+    def _on_ai_backend_ready(self, backend_type: str):
+        """AI 后端探测完成"""
+        self.logger.info(f"AI 后端: {backend_type}")
+        self.update_status()
+
+    def _ai_backend_text(self) -> str:
+        """当前 AI 后端名称（不等待后台探测）"""
+        if not self.ai_engine:
+            return '未初始化'
+        backend_type = self.ai_engine.backend_type
+        return '正在检测...' if backend_type == 'pending' else backend_type
+
     def show_ai_settings(self):
         """显示 AI 设置对话框"""
         # 确保 AI 引擎已初始化
@@ -1961,6 +2390,7 @@ class MainWindow(QMainWindow):
                 except ImportError:
                     from config import reload_config
                     self.config = reload_config()
+                self._search_cache.clear()
 
                 # 重新初始化AI引擎
                 try:
@@ -1970,6 +2400,7 @@ class MainWindow(QMainWindow):
 
                 close_ai_engine()
                 self.ai_engine = get_ai_engine(self.config)
+                self._watch_ai_backend()
                 self.update_status()
 
         except Exception as e:
@@ -1981,7 +2412,7 @@ class MainWindow(QMainWindow):
                 self,
                 "AI 设置",
                 f"AI 功能状态: {'启用' if self.config.ai.enabled else '禁用'}\n\n"
-                f"当前后端: {self.ai_engine.backend_type if self.ai_engine else '未初始化'}\n\n"
+                f"当前后端: {self._ai_backend_text()}\n\n"
                 f"打开设置对话框失败: {str(e)}"
             )
     
@@ -2022,12 +2453,19 @@ class MainWindow(QMainWindow):
         self.save_settings()
         self.logger.info("设置已保存")
 
-        # 等待搜索线程完成
-        if hasattr(self, 'search_thread') and self.search_thread and self.search_thread.isRunning():
-            self.logger.info("等待搜索线程完成...")
-            self.search_thread.quit()
-            self.search_thread.wait(500)
-            self.logger.info("搜索线程已停止")
+        # 等待搜索任务完成
+        if hasattr(self, 'search_task') and self.search_task:
+            self.logger.info("等待搜索任务完成...")
+            self.search_task.cancel()
+            QThreadPool.globalInstance().waitForDone(500)
+            self.logger.info("搜索任务已停止")
+
+        # 停止生成 AI 回答（包括已被新搜索丢弃、仍在结束中的线程）
+        for worker in self.findChildren(AIWorker):
+            if worker.isRunning():
+                self.logger.info("停止生成 AI 回答...")
+                worker.cancel()
+                worker.wait(2000)
 
         # 等待AI搜索线程完成
         if hasattr(self, 'ai_search_thread') and self.ai_search_thread and self.ai_search_thread.isRunning():
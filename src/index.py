@@ -11,9 +11,8 @@ import hashlib
 import fnmatch
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Optional, Tuple, Set, Iterator
 from dataclasses import dataclass, asdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import whoosh
 from whoosh import index
@@ -83,11 +82,8 @@ class FileIndexer:
         self.config = config or get_config()
         self.logger = logger.bind(module="indexer")
         
-        # 文件解析器
-        self.parser = get_parser()
-        
-        # 线程池
-        self.executor = ThreadPoolExecutor(max_workers=self.config.advanced.parser_threads)
+        # 文件解析器（索引时用其进程池并行解析，进程数为 advanced.parser_threads）
+        self.parser = get_parser(self.config.advanced.cache_size_mb)
         
         # 索引架构
         self.schema = Schema(
@@ -178,45 +174,75 @@ class FileIndexer:
                 return True, ext_supported
         else:
             # 排除模式：排除匹配排除模式的文件
-            for pattern in self.config.index.exclude_patterns:
-                if fnmatch.fnmatch(path_obj.name, pattern):
-                    return False, False
-                if fnmatch.fnmatch(str(path_obj), pattern):
-                    return False, False
+            if self.config.index.match_exclude_pattern(str(path_obj)) is not None:
+                return False, False
 
             # 根据扩展名决定是否解析内容
             return True, ext_supported
     
-    def _index_file(self, file_path: str) -> Optional[Dict[str, Any]]:
+    def _iter_documents(self, file_paths: List[str]) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
         """
-        索引单个文件
+        按输入顺序逐个产出 (文件路径, 索引文档)，文档为 None 表示跳过该文件
+
+        需要解析内容的文件交给解析器的进程池并行解析；提前关闭生成器时取消尚未开始的解析
+
+        Args:
+            file_paths: 文件路径列表
+        """
+        # 先判断每个文件是否索引、是否解析内容（只需 stat 和模式匹配）
+        plans = []
+        parse_paths = []
+        for file_path in file_paths:
+            try:
+                should_index, parse_content = self._should_index(file_path)
+            except Exception as e:
+                self.logger.warning(f"检查文件时出错 {file_path}: {e}")
+                should_index, parse_content = False, False
+            plans.append((file_path, should_index, parse_content))
+            if should_index and parse_content:
+                parse_paths.append(file_path)
+
+        contents = self.parser.parse_many(parse_paths, max_workers=self.config.advanced.parser_threads)
+        try:
+            for file_path, should_index, parse_content in plans:
+                if not should_index:
+                    yield file_path, None
+                    continue
+
+                content = ""
+                if parse_content:
+                    # 解析结果与 parse_paths 顺序一致
+                    try:
+                        _, content = next(contents)
+                    except Exception as e:
+                        # 进程池异常（如子进程崩溃）时，剩余文件改为在当前进程解析
+                        self.logger.error(f"并行解析失败，改为逐个解析: {e}")
+                        remaining = parse_paths[parse_paths.index(file_path):]
+                        contents = ((path, self.parser.parse(path)) for path in remaining)
+                        _, content = next(contents)
+                    content = content or ""
+
+                yield file_path, self._build_document(file_path, content)
+        finally:
+            contents.close()
+
+    def _build_document(self, file_path: str, content: str) -> Optional[Dict[str, Any]]:
+        """
+        构建单个文件的索引文档
 
         Args:
             file_path: 文件路径
+            content: 已解析的文件内容（不解析内容的文件为空字符串）
 
         Returns:
             索引文档字典，如果失败则返回 None
         """
         try:
-            should_index, parse_content = self._should_index(file_path)
-            if not should_index:
-                return None
-
             # 获取文件元数据
             metadata = FileMetadata.from_path(file_path)
             if metadata is None:
                 return None
 
-            # 根据是否支持解析来决定是否读取内容
-            if parse_content:
-                # 支持的扩展名：解析文件内容
-                content = self.parser.parse(file_path)
-                if content is None:
-                    content = ""
-            else:
-                # 不支持的扩展名：不解析内容，只记录元数据
-                content = ""
-
             metadata.content = content
             metadata.checksum = metadata.calculate_checksum(content)
 
@@ -359,14 +385,14 @@ class FileIndexer:
                 stats['cancelled'] = True
                 return stats
 
-        # 使用线程池并行处理文件
+        # 使用解析器的进程池并行解析文件内容，结果按顺序写入索引
         # 批量提交大小（每N个文件提交一次，避免内存问题）
         # 降低到10以防止内存溢出导致的闪退
         BATCH_SIZE = 10
 
         writer = None
         batch_count = 0
-        futures = {}
+        documents = None
         completed_count = 0
         pending_docs = []  # 待提交的文档
 
@@ -374,30 +400,19 @@ class FileIndexer:
             self.logger.info(f"创建 AsyncWriter，开始索引 {files_to_process} 个文件，批量大小: {BATCH_SIZE}")
             writer = AsyncWriter(self.ix)
 
-            self.logger.info(f"提交 {len(files_to_index)} 个文件到线程池...")
-            for file_path in files_to_index:
-                future = self.executor.submit(self._index_file, file_path)
-                futures[future] = file_path
+            documents = self._iter_documents(files_to_index)
 
-            self.logger.info(f"开始处理 {len(futures)} 个文件的索引结果...")
+            self.logger.info(f"开始处理 {files_to_process} 个文件的索引结果...")
 
             # 处理结果
-            for future in as_completed(futures):
-                file_path = futures[future]
-
-                # 检查是否取消
+            for file_path, doc in documents:
+                # 检查是否取消（跳出循环后关闭生成器，取消尚未开始的解析）
                 if check_cancel():
-                    # 取消未完成的任务
-                    for f in futures:
-                        if not f.done():
-                            f.cancel()
                     stats['cancelled'] = True
                     self.logger.info("用户取消索引操作")
                     break
 
                 try:
-                    self.logger.debug(f"获取文件结果: {file_path}")
-                    doc = future.result(timeout=60)  # 增加超时时间
                     if doc:
                         pending_docs.append(doc)
                         stats['indexed_files'] += 1
@@ -466,9 +481,6 @@ class FileIndexer:
                                 stats
                             )
                             if result is False:
-                                for f in futures:
-                                    if not f.done():
-                                        f.cancel()
                                 stats['cancelled'] = True
                                 self.logger.info("用户取消索引操作")
                                 break
@@ -481,9 +493,6 @@ class FileIndexer:
                             stats
                         )
                         if result is False:
-                            for f in futures:
-                                if not f.done():
-                                    f.cancel()
                             stats['cancelled'] = True
                             self.logger.info("用户取消索引操作")
                             break
@@ -505,6 +514,9 @@ class FileIndexer:
                             stats
                         )
 
+            # 取消时停止剩余文件的解析
+            documents.close()
+
             # 提交剩余的文档
             if not stats['cancelled'] and pending_docs:
                 batch_count += 1
@@ -539,6 +551,8 @@ class FileIndexer:
             self.logger.error(f"索引过程发生严重错误: {e}")
             import traceback
             self.logger.error(f"索引过程严重错误堆栈:\n{traceback.format_exc()}")
+            if documents is not None:
+                documents.close()
             # 取消writer
             if writer:
                 try:
@@ -723,11 +737,10 @@ class FileIndexer:
                                     delete_reason = "不符合包含模式"
                         else:
                             # 排除模式：检查是否符合排除规则
-                            for pattern in self.config.index.exclude_patterns:
-                                if fnmatch.fnmatch(path_obj.name, pattern) or fnmatch.fnmatch(path, pattern):
-                                    should_delete = True
-                                    delete_reason = f"符合排除规则: {pattern}"
-                                    break
+                            pattern = self.config.index.match_exclude_pattern(path)
+                            if pattern is not None:
+                                should_delete = True
+                                delete_reason = f"符合排除规则: {pattern}"
 
                         # 注意：不再因扩展名不支持而删除索引
                         # 现在会保留所有文件的元数据，即使不支持解析内容
@@ -1012,8 +1025,6 @@ class FileIndexer:
     
     def close(self) -> None:
         """关闭索引器"""
-        if self.executor:
-            self.executor.shutdown(wait=True)
         self.ix = None
 
 
@@ -8,6 +8,7 @@
 import sys
 import os
 import atexit
+import multiprocessing
 from pathlib import Path
 from datetime import datetime
 
@@ -197,4 +198,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的程序启动解析子进程时需要
+    multiprocessing.freeze_support()
     main()
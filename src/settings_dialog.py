@@ -225,6 +225,9 @@ class SettingsDialog(QDialog):
         self.temperature.setSingleStep(0.1)
         model_layout.addRow("温度:", self.temperature)
         
+        self.auto_quantize = QCheckBox("自动将 F16/F32 模型量化为 Q4_K_M（在模型旁保存副本）")
+        model_layout.addRow(self.auto_quantize)
+        
         model_group.setLayout(model_layout)
         layout.addWidget(model_group)
         
@@ -348,6 +351,7 @@ class SettingsDialog(QDialog):
         self.context_size.setValue(self.config.ai.context_size)
         self.max_tokens.setValue(self.config.ai.max_tokens)
         self.temperature.setValue(self.config.ai.temperature)
+        self.auto_quantize.setChecked(self.config.ai.auto_quantize)
         
         # 界面
         theme_index = self.theme_combo.findData(self.config.gui.theme)
@@ -412,6 +416,7 @@ class SettingsDialog(QDialog):
             self.config.ai.context_size = self.context_size.value()
             self.config.ai.max_tokens = self.max_tokens.value()
             self.config.ai.temperature = self.temperature.value()
+            self.config.ai.auto_quantize = self.auto_quantize.isChecked()
 
             # 验证AI配置
             if self.config.ai.enabled:
@@ -529,6 +534,7 @@ class SettingsDialog(QDialog):
         self.context_size.setEnabled(enabled)
         self.max_tokens.setEnabled(enabled)
         self.temperature.setEnabled(enabled)
+        self.auto_quantize.setEnabled(enabled)
     
     def _on_ok(self):
         """确定按钮"""
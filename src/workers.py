@@ -5,6 +5,8 @@
 将耗时操作放在后台线程，避免界面卡顿
 """
 
+import threading
+
 from PyQt6.QtCore import QThread, pyqtSignal
 from loguru import logger
 from typing import List, Dict, Any, Optional
@@ -81,6 +83,7 @@ class AIWorker(QThread):
     """AI工作线程"""
     
     # 信号
+    token_ready = pyqtSignal(str)  # 流式生成的文本片段
     response_ready = pyqtSignal(str)  # AI回答
     error = pyqtSignal(str)  # 错误消息
     
@@ -89,19 +92,26 @@ class AIWorker(QThread):
         self.ai_engine = ai_engine
         self.question = question
         self.file_context = file_context
+        self._cancel_event = threading.Event()
         
     def run(self):
         """执行AI推理"""
         try:
-            response = self.ai_engine.answer_question(
+            response = self.ai_engine.generate_answer(
                 self.question,
-                self.file_context
+                self.file_context,
+                on_token=self.token_ready.emit,
+                cancel_event=self._cancel_event
             )
             self.response_ready.emit(response)
         except Exception as e:
             self.error.emit(str(e))
             logger.error(f"AI推理失败: {e}")
 
+    def cancel(self):
+        """停止生成，已生成的部分仍通过 response_ready 发出"""
+        self._cancel_event.set()
+
 
 class ModelDownloadWorker(QThread):
     """模型下载工作线程"""
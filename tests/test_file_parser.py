@@ -0,0 +1,41 @@
+"""文件解析器回归样例"""
+
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.file_parser import FileParser
+
+_W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_MC = 'http://schemas.openxmlformats.org/markup-compatibility/2006'
+
+# 一个段落："Before" + 文本框 "BOXTEXT"（mc:Choice 与 mc:Fallback 各一份）+ "After"
+_TEXT_BOX_DOCUMENT = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="{_W}" xmlns:mc="{_MC}"><w:body>
+<w:p>
+  <w:r><w:t>Before</w:t></w:r>
+  <w:r><mc:AlternateContent>
+    <mc:Choice Requires="wps"><w:drawing><w:txbxContent>
+      <w:p><w:r><w:t>BOXTEXT</w:t></w:r></w:p>
+    </w:txbxContent></w:drawing></mc:Choice>
+    <mc:Fallback><w:pict><w:txbxContent>
+      <w:p><w:r><w:t>BOXTEXT</w:t></w:r></w:p>
+    </w:txbxContent></w:pict></mc:Fallback>
+  </mc:AlternateContent></w:r>
+  <w:r><w:t>After</w:t></w:r>
+</w:p>
+</w:body></w:document>'''
+
+
+def test_docx_text_box_does_not_split_or_duplicate_paragraph(tmp_path):
+    path = tmp_path / 'text_box.docx'
+    with zipfile.ZipFile(path, 'w') as z:
+        z.writestr('word/document.xml', _TEXT_BOX_DOCUMENT)
+    
+    content = FileParser().parse(str(path))
+    
+    lines = content.split('\n')
+    assert 'BeforeAfter' in lines
+    assert lines.count('BOXTEXT') == 1